@@ -6,8 +6,13 @@ human persona to engage scammers in multi-turn conversations for
 intelligence extraction.
 """
 
-from typing import List, Dict
+from typing import List, Dict, AsyncIterator, Optional, Set, Tuple
+import os
+import asyncio
 import logging
+import re
+
+from app.utils.cache import LRUCache, SemanticCache, SingleFlight, message_key, normalize_text
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +26,8 @@ class Actor:
     scammers engaged for maximum intelligence extraction.
     
     Attributes:
-        system_prompt (str): Detailed persona instructions for the AI
+        CHAT_SYSTEM_PROMPT (str): Persona instructions sent first in every
+            chat request
     """
     
     # Persona constants
@@ -30,10 +36,36 @@ class Actor:
     PERSONA_OCCUPATION = "Retired railway clerk"
     PERSONA_LOCATION = "Pune, India"
     
-    def __init__(self):
-        """Initialize Actor with pre-defined persona strategy."""
-        self.system_prompt = f"""
-        You are {self.PERSONA_NAME}, a {self.PERSONA_AGE}-year-old {self.PERSONA_OCCUPATION} from {self.PERSONA_LOCATION}.
+    # Leading role labels the LLM sometimes emits (stripped from replies)
+    LABEL_PATTERN = re.compile(rf"^\s*(?:(?:{re.escape(PERSONA_NAME)}|ASSISTANT|YOU):\s*)+")
+    
+    # History role labels by sender (anything else is the persona)
+    ROLE_LABELS = {"scammer": "SCAMMER"}
+    
+    # Chat roles by sender: the scammer is the user, the persona the assistant
+    CHAT_ROLES = {"scammer": "user"}
+    
+    # History windowing: recent turns are sent verbatim, older ones summarized
+    HISTORY_WINDOW = 6
+    SUMMARY_INTERVAL = 10
+    SUMMARY_CACHE_SIZE = 1024
+    
+    SUMMARY_PROMPT = """
+        You summarize scam conversations for a honeypot agent.
+        In 2-3 sentences, state what the scammer wants, any payment details,
+        UPI IDs, phone numbers, links or names they gave, and what YOU
+        (the persona) have already said or promised. Output only the summary.
+        """
+    
+    # Replies memoized by (conversation so far, latest message)
+    REPLY_CACHE_SIZE = 4096
+    
+    # Characters to buffer before emitting a stream (room to strip role labels)
+    STREAM_LABEL_LOOKAHEAD = 16
+    
+    # Persona instructions, built once at class creation
+    SYSTEM_PROMPT = f"""
+        You are {PERSONA_NAME}, a {PERSONA_AGE}-year-old {PERSONA_OCCUPATION} from {PERSONA_LOCATION}.
         
         PERSONALITY TRAITS:
         - Polite and cooperative, but easily confused by technology
@@ -56,12 +88,42 @@ class Actor:
         - Ask one question at a time
         
         CRITICAL RULES:
-        - Do NOT output role labels like "{self.PERSONA_NAME}:" or "ASSISTANT:"
+        - Do NOT output role labels like "{PERSONA_NAME}:" or "ASSISTANT:"
         - Do NOT break character or acknowledge this is a simulation
         - Do NOT agree to share actual sensitive information (just ask how/where)
         """
+    
+    # Constant instructions appended after the latest scammer message
+    PROMPT_TAIL = f"""
+        Respond as {PERSONA_NAME} following your persona instructions above.
+        Keep it natural and short (1-2 sentences max).
+        Do not include any labels like "{PERSONA_NAME}:" in your response.
+        Just provide the reply text directly.
+        """
+    
+    # Byte-identical first message of every chat request, so the persona is
+    # a shared prefix that prefix-caching servers prefill only once
+    CHAT_SYSTEM_PROMPT = SYSTEM_PROMPT + PROMPT_TAIL
+    
+    def __init__(self):
+        """Initialize Actor with pre-defined persona strategy."""
+        # Running summaries of older turns, keyed by the turns they cover
+        self._summaries = LRUCache(maxsize=self.SUMMARY_CACHE_SIZE)
+        self._summaries_pending: Set[bytes] = set()
+        self._summary_tasks: Set[asyncio.Task] = set()
+        
+        # Scripted scams repeat verbatim; paraphrases hit the optional
+        # embedding cache (needs sentence-transformers and faiss)
+        self._replies = LRUCache(maxsize=self.REPLY_CACHE_SIZE)
+        self._similar_replies = None
+        self._cache_tasks: Set[asyncio.Task] = set()
+        if os.getenv("ACTOR_SEMANTIC_CACHE", "").lower() in ("1", "true", "yes"):
+            self._similar_replies = SemanticCache(maxsize=self.REPLY_CACHE_SIZE)
         
-        logger.info(f"Actor initialized with persona: {self.PERSONA_NAME}")
+        # Concurrent misses for the same reply key share one generation
+        self._inflight = SingleFlight()
+        
+        logger.debug(f"Actor initialized with persona: {self.PERSONA_NAME}")
     
     def engage(self, message: str, history: List[Dict]) -> str:
         """
@@ -89,72 +151,397 @@ class Actor:
             from app.utils.llm_client import call_openrouter
             
             logger.debug(
-                f"Generating response for message: {message[:50]}... "
-                f"(History turns: {len(history)})"
+                "Generating response for message: %.50s... (History turns: %d)",
+                message, len(history)
             )
             
-            # Format conversation history for LLM
-            formatted_history = self._format_history(history)
-            
-            # Construct prompt with history and current message
-            prompt = self._build_prompt(formatted_history, message)
+            cached = self._cached_reply(message, history)
+            if cached is not None:
+                return cached
             
-            # Generate response using LLM
-            response = call_openrouter(prompt, system_prompt=self.system_prompt)
+            # Persona prefix, then history as chat turns, then the new message
+            response = call_openrouter(
+                message,
+                system_prompt=self.CHAT_SYSTEM_PROMPT,
+                history=self._build_chat_history(history)
+            )
             
             # Clean up response
             cleaned_response = self._clean_response(response)
+            self._remember_reply(message, history, response, cleaned_response)
             
-            logger.info(f"Generated response: {cleaned_response[:50]}...")
+            logger.debug("Generated response: %.50s...", cleaned_response)
             
             return cleaned_response
             
         except Exception as e:
-            logger.error(f"Error generating response: {str(e)}", exc_info=True)
+            logger.error("Error generating response: %s", e, exc_info=True)
+            return self._get_fallback_response(message)
+    
+    async def engage_async(self, message: str, history: List[Dict]) -> str:
+        """
+        Generate the agent's response without blocking the event loop.
+        
+        Same persona, prompt and cleanup as ``engage``. Each conversation
+        gets its own LLM request; concurrent requests are batched by the
+        serving engine (e.g. vLLM continuous batching behind
+        ``LLM_BASE_URL``), never packed into one prompt. The task can be
+        cancelled at any point (e.g. when the reply is no longer needed).
+        
+        Args:
+            message: Latest message from scammer
+            history: Conversation history as list of dicts with 'sender' and 'text'
+            
+        Returns:
+            str: Agent's response in character
+        """
+        cached = await self._acached_reply(message, history)
+        if cached is not None:
+            return cached
+        
+        try:
+            # Identical concurrent requests (same message and history, e.g. a
+            # campaign's opening line) share one generation
+            return await self._inflight.run(
+                self._reply_key(message, history),
+                lambda: self._engage_one(message, history)
+            )
+        except Exception as e:
+            logger.error("Error generating response: %s", e, exc_info=True)
             return self._get_fallback_response(message)
     
-    def _format_history(self, history: List[Dict]) -> str:
+    async def _engage_one(self, message: str, history: List[Dict]) -> str:
+        """
+        Generate one reply with its own LLM request.
+        
+        Args:
+            message: Latest message from scammer
+            history: Conversation history as list of dicts with 'sender' and 'text'
+            
+        Returns:
+            str: Agent's response in character
+        """
+        try:
+            from app.utils.llm_client import acall_openrouter
+            
+            response = await acall_openrouter(
+                message,
+                system_prompt=self.CHAT_SYSTEM_PROMPT,
+                history=self._build_chat_history(history)
+            )
+            cleaned_response = self._clean_response(response)
+            self._schedule_remember_reply(message, history, response, cleaned_response)
+            
+            logger.debug("Generated response: %.50s...", cleaned_response)
+            
+            return cleaned_response
+            
+        except Exception as e:
+            logger.error("Error generating response: %s", e, exc_info=True)
+            return self._get_fallback_response(message)
+    
+    async def engage_stream(self, message: str, history: List[Dict]) -> AsyncIterator[str]:
+        """
+        Stream the agent's response to the scammer as it is generated.
+        
+        Same persona and messages as ``engage``; the first few characters are
+        buffered so a leading role label can be stripped, and trailing quotes
+        are held back until more text (or the end of the stream) arrives.
+        Only completed streams are cached; if the LLM stream breaks off, the
+        text already sent stands but is never served as a cached reply.
+        
+        Args:
+            message: Latest message from scammer
+            history: Conversation history as list of dicts with 'sender' and 'text'
+            
+        Yields:
+            str: Successive pieces of the cleaned, in-character response
+        """
+        produced = False
+        
+        try:
+            from app.utils.llm_client import stream_openrouter
+            
+            cached = await self._acached_reply(message, history)
+            if cached is not None:
+                produced = True
+                yield cached
+                return
+            
+            chat_history = self._build_chat_history(history)
+            
+            raw: List[str] = []
+            head: List[str] = []
+            head_len = 0
+            started = False
+            held = ""
+            
+            async for delta in stream_openrouter(
+                message,
+                system_prompt=self.CHAT_SYSTEM_PROMPT,
+                history=chat_history
+            ):
+                raw.append(delta)
+                if not started:
+                    head.append(delta)
+                    head_len += len(delta)
+                    if head_len < self.STREAM_LABEL_LOOKAHEAD:
+                        continue
+                    delta = self._strip_leading_labels("".join(head))
+                    started = True
+                
+                # Hold back trailing quotes/whitespace; they may end the reply
+                text = held + delta
+                if not produced:
+                    # A label can fill the whole lookahead; drop the gap after it
+                    text = text.lstrip()
+                body = text.rstrip(' "\'')
+                held = text[len(body):]
+                if body:
+                    produced = True
+                    yield body
+            
+            if not started:
+                cleaned = self._clean_response("".join(head))
+                if cleaned:
+                    produced = True
+                    yield cleaned
+            
+            # Reached only when the stream completed (interruptions raise)
+            response = "".join(raw)
+            self._schedule_remember_reply(message, history, response, self._clean_response(response))
+                    
+        except Exception as e:
+            logger.error("Error streaming response: %s", e, exc_info=True)
+            if not produced:
+                yield self._get_fallback_response(message)
+    
+    def _build_chat_history(self, history: List[Dict]) -> List[Dict[str, str]]:
+        """
+        Convert conversation history to chat messages.
+        
+        Only the last ``HISTORY_WINDOW`` turns (plus those since the last
+        summary refresh) are sent verbatim; older turns are replaced by a
+        running summary refreshed every ``SUMMARY_INTERVAL`` turns, sent as a
+        system message ahead of the verbatim turns. While a refresh is
+        pending the previous summary is used, and with no summary at all the
+        full history is sent.
+        
+        Args:
+            history: List of message dictionaries
+            
+        Returns:
+            List of ``role``/``content`` dicts
+        """
+        summary, turns = self._window_history(history)
+        
+        messages = []
+        if summary is not None:
+            messages.append({"role": "system", "content": f"Earlier summary: {summary}"})
+        role = self.CHAT_ROLES.get
+        messages.extend(
+            {"role": role(turn["sender"], "assistant"), "content": turn["text"]}
+            for turn in turns
+        )
+        return messages
+    
+    def _window_history(self, history: List[Dict]) -> Tuple[Optional[str], List[Dict]]:
         """
-        Format conversation history for LLM context.
+        Split history into a summary of older turns and the turns sent verbatim.
         
         Args:
             history: List of message dictionaries
             
         Returns:
-            str: Formatted history string
+            Tuple of (summary or None, verbatim turns); without a summary
+            every turn is verbatim
         """
-        if not history:
-            return "No previous conversation."
+        older = max(len(history) - self.HISTORY_WINDOW, 0)
+        cut = older - older % self.SUMMARY_INTERVAL
         
-        formatted = []
-        for turn in history:
-            role = "SCAMMER" if turn["sender"] == "scammer" else "YOU"
-            formatted.append(f"{role}: {turn['text']}")
+        summary = self._get_summary(history[:cut]) if cut else None
+        while summary is None and cut > self.SUMMARY_INTERVAL:
+            cut -= self.SUMMARY_INTERVAL
+            summary = self._summaries.get(self._summary_key(history[:cut]))
+        
+        if summary is None:
+            return None, history
+        return summary, history[cut:]
+    
+    def _format_turns(self, turns: List[Dict]) -> str:
+        """
+        Format turns as role-labelled lines.
         
-        return "\n".join(formatted)
+        Args:
+            turns: List of message dictionaries
+            
+        Returns:
+            str: One "ROLE: text" line per turn
+        """
+        role = self.ROLE_LABELS.get
+        return "\n".join(
+            f"{role(turn['sender'], 'YOU')}: {turn['text']}" for turn in turns
+        )
     
-    def _build_prompt(self, history: str, current_message: str) -> str:
+    def _summary_key(self, turns: List[Dict]) -> bytes:
+        """Cache key identifying a prefix of the conversation."""
+        return message_key(*(f"{turn['sender']}:{turn['text']}" for turn in turns))
+    
+    def _get_summary(self, turns: List[Dict]) -> Optional[str]:
         """
-        Build complete prompt for LLM.
+        Return the cached summary of ``turns``, scheduling a refresh if missing.
         
         Args:
-            history: Formatted conversation history
-            current_message: Latest scammer message
+            turns: Older turns to be summarized
             
         Returns:
-            str: Complete prompt
+            str: Summary, or None if it is not available yet
         """
-        return f"""
-        Conversation so far:
-        {history}
+        key = self._summary_key(turns)
+        summary = self._summaries.get(key)
+        if summary is not None or key in self._summaries_pending:
+            return summary
         
-        SCAMMER (latest message): {current_message}
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to refresh on; caller sends turns verbatim
+            return None
         
-        Respond as {self.PERSONA_NAME} following your persona instructions above.
-        Keep it natural and short (1-2 sentences max).
-        Do not include any labels like "{self.PERSONA_NAME}:" in your response.
-        Just provide the reply text directly.
+        self._summaries_pending.add(key)
+        task = loop.create_task(self._refresh_summary(key, turns))
+        self._summary_tasks.add(task)
+        task.add_done_callback(self._summary_tasks.discard)
+        return None
+    
+    async def _refresh_summary(self, key: bytes, turns: List[Dict]) -> None:
         """
+        Summarize ``turns`` in the background and cache the result.
+        
+        Builds on the summary of the previous interval when available, so
+        each refresh only sends ``SUMMARY_INTERVAL`` new turns.
+        
+        Args:
+            key: Cache key for ``turns``
+            turns: Older turns to be summarized
+        """
+        try:
+            from app.utils.llm_client import acall_openrouter, FALLBACK_RESPONSES
+            
+            previous_cut = len(turns) - self.SUMMARY_INTERVAL
+            previous = self._summaries.get(self._summary_key(turns[:previous_cut])) if previous_cut else None
+            
+            if previous is not None:
+                prompt = (
+                    f"Summary so far: {previous}\n\n"
+                    f"New turns:\n{self._format_turns(turns[previous_cut:])}"
+                )
+            else:
+                prompt = f"Conversation:\n{self._format_turns(turns)}"
+            
+            summary = (await acall_openrouter(prompt, system_prompt=self.SUMMARY_PROMPT)).strip()
+            
+            # Do not cache fallback/error text as if it were a summary
+            if summary and summary not in FALLBACK_RESPONSES and not summary.startswith("Error:"):
+                self._summaries.set(key, summary)
+                logger.debug("History summary refreshed (%d turns)", len(turns))
+                
+        except Exception as e:
+            logger.warning("History summary failed: %s", e)
+        finally:
+            self._summaries_pending.discard(key)
+    
+    def _cached_reply(self, message: str, history: List[Dict]) -> Optional[str]:
+        """
+        Return a reply cached for this message in this conversation state.
+        
+        Args:
+            message: Latest message from scammer
+            history: Conversation history as list of dicts with 'sender' and 'text'
+            
+        Returns:
+            str: Cached reply, or None on a miss
+        """
+        reply = self._replies.get(self._reply_key(message, history))
+        if reply is None and self._similar_replies is not None:
+            reply = self._similar_replies.get(self._summary_key(history), message)
+        
+        if reply is not None:
+            logger.debug("Reply cache hit")
+        return reply
+    
+    async def _acached_reply(self, message: str, history: List[Dict]) -> Optional[str]:
+        """
+        ``_cached_reply`` for async callers.
+        
+        The exact lookup is a dict access; the embedding lookup is CPU-bound
+        and runs in a worker thread so it does not stall other requests.
+        
+        Args:
+            message: Latest message from scammer
+            history: Conversation history as list of dicts with 'sender' and 'text'
+            
+        Returns:
+            str: Cached reply, or None on a miss
+        """
+        reply = self._replies.get(self._reply_key(message, history))
+        if reply is None and self._similar_replies is not None:
+            reply = await self._similar_replies.aget(self._summary_key(history), message)
+        
+        if reply is not None:
+            logger.debug("Reply cache hit")
+        return reply
+    
+    def _remember_reply(self, message: str, history: List[Dict], response: str, reply: str) -> None:
+        """
+        Cache a generated reply unless it is fallback/error text.
+        
+        Args:
+            message: Latest message from scammer
+            history: Conversation history the reply was generated for
+            response: Raw LLM output
+            reply: Cleaned reply
+        """
+        if not self._is_cacheable(response, reply):
+            return
+        
+        self._replies.set(self._reply_key(message, history), reply)
+        if self._similar_replies is not None:
+            self._similar_replies.set(self._summary_key(history), message, reply)
+    
+    def _schedule_remember_reply(self, message: str, history: List[Dict], response: str, reply: str) -> None:
+        """
+        ``_remember_reply`` for async callers.
+        
+        The exact entry is stored immediately; the embedding is computed in
+        a background thread so the reply is not held up by it.
+        
+        Args:
+            message: Latest message from scammer
+            history: Conversation history the reply was generated for
+            response: Raw LLM output
+            reply: Cleaned reply
+        """
+        if not self._is_cacheable(response, reply):
+            return
+        
+        self._replies.set(self._reply_key(message, history), reply)
+        if self._similar_replies is not None and self._similar_replies.enabled:
+            task = asyncio.get_running_loop().create_task(
+                self._similar_replies.aset(self._summary_key(history), message, reply)
+            )
+            self._cache_tasks.add(task)
+            task.add_done_callback(self._cache_tasks.discard)
+    
+    def _is_cacheable(self, response: str, reply: str) -> bool:
+        """Whether a reply is real LLM output (not fallback/error text)."""
+        from app.utils.llm_client import FALLBACK_RESPONSES
+        
+        return bool(reply) and response not in FALLBACK_RESPONSES and not response.startswith("Error:")
+    
+    def _reply_key(self, message: str, history: List[Dict]) -> bytes:
+        """Cache key of the reply to ``message`` after exactly ``history``."""
+        return message_key(self._summary_key(history).hex(), normalize_text(message))
     
     def _clean_response(self, response: str) -> str:
         """
@@ -166,15 +553,20 @@ class Actor:
         Returns:
             str: Cleaned response
         """
-        # Remove quotes and extra whitespace
-        cleaned = response.strip(' "\'')
-        
-        # Remove role labels if present
-        for label in [f"{self.PERSONA_NAME}:", "ASSISTANT:", "YOU:"]:
-            if cleaned.startswith(label):
-                cleaned = cleaned[len(label):].strip()
+        # Remove quotes and extra whitespace, then role labels if present
+        return self.LABEL_PATTERN.sub("", response.strip(' "\''), count=1).rstrip()
+    
+    def _strip_leading_labels(self, text: str) -> str:
+        """
+        Remove leading quotes and role labels from the start of a stream.
         
-        return cleaned
+        Args:
+            text: Beginning of the LLM output
+            
+        Returns:
+            str: Text with leading quotes/labels removed
+        """
+        return self.LABEL_PATTERN.sub("", text.lstrip(' "\''), count=1)
     
     def _get_fallback_response(self, message: str) -> str:
         """
@@ -0,0 +1,115 @@
+"""
+Batch Scheduler - Async Micro-Batching
+
+Collects items submitted concurrently on the event loop and hands them to a
+batch handler in groups, so N pending requests can share one LLM round-trip.
+A batch is dispatched when it reaches ``batch_size`` items or when the oldest
+item has waited ``max_wait_ms``, whichever comes first.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BatchScheduler:
+    """
+    Groups concurrent submissions into batches for a single handler call.
+    
+    Attributes:
+        handler: Coroutine function taking a list of items and returning a
+            list of results in the same order
+        batch_size (int): Maximum number of items per batch
+        max_wait (float): Maximum time in seconds to wait for a batch to fill
+    """
+    
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        batch_size: int = 8,
+        max_wait_ms: int = 25
+    ):
+        """Initialize scheduler; the worker task starts on first submit."""
+        self.handler = handler
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Set[asyncio.Task] = set()
+    
+    async def submit(self, item: Any) -> Any:
+        """
+        Submit an item and wait for its result.
+        
+        Args:
+            item: Item to be processed as part of a batch
+        
+        Returns:
+            The handler's result for this item
+        
+        Raises:
+            Exception: Whatever the handler raised for the batch
+        """
+        loop = asyncio.get_running_loop()
+        
+        # Queue and worker are bound to the loop they were created on
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._loop = loop
+            self._worker = loop.create_task(self._run())
+        
+        future = loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+    
+    async def _run(self) -> None:
+        """Collect items into batches and dispatch them until cancelled."""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            # Dispatch without blocking collection of the next batch
+            task = loop.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+    
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        """
+        Run the handler on one batch and resolve each item's future.
+        
+        Args:
+            batch: List of (item, future) pairs
+        """
+        logger.debug("Dispatching batch of %d items", len(batch))
+        
+        try:
+            results = await self.handler([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+        
+        # Guard against handlers returning fewer results than items
+        for _, future in batch[len(results):]:
+            if not future.done():
+                future.set_exception(RuntimeError("Batch handler returned no result"))
@@ -0,0 +1,320 @@
+"""
+Cache Utilities - In-Memory LRU with Optional Disk Persistence
+
+Scam campaigns replay near-identical scripts across sessions, so expensive
+results (LLM verdicts and replies) are memoized by a hash of their inputs.
+Entries live in a bounded in-memory LRU; if ``diskcache`` is installed and a
+directory is configured they are also persisted so the cache survives
+restarts.
+
+``SemanticCache`` additionally matches paraphrased texts by embedding
+similarity when ``sentence-transformers`` and ``faiss`` are installed.
+
+``SingleFlight`` covers the cold start of a hot key: concurrent misses for
+the same key share one computation instead of each calling the LLM.
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+try:
+    import faiss
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    faiss = None
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form of a message for cache keys.
+    
+    Lowercases and collapses whitespace so trivially different copies of a
+    scam template share one entry.
+    
+    Args:
+        text: Raw message text
+    
+    Returns:
+        str: Normalized text
+    """
+    return " ".join(text.lower().split())
+
+
+def message_key(*parts: str) -> bytes:
+    """
+    Build a compact cache key from one or more strings.
+    
+    Args:
+        *parts: Key components (e.g. model name and message text)
+    
+    Returns:
+        bytes: 16-byte BLAKE2b digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.digest()
+
+
+class LRUCache:
+    """
+    Bounded least-recently-used cache with optional disk backing.
+    
+    Attributes:
+        maxsize (int): Maximum number of in-memory entries
+    """
+    
+    def __init__(self, maxsize: int = 4096, directory: Optional[str] = None):
+        """
+        Initialize cache.
+        
+        Args:
+            maxsize: Maximum number of in-memory entries
+            directory: Optional diskcache directory for persistence
+        """
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, Any]" = OrderedDict()
+        self._disk = None
+        
+        if directory:
+            if diskcache is None:
+                logger.warning("diskcache not installed - cache will not persist")
+            else:
+                self._disk = diskcache.Cache(directory)
+                logger.info(f"Persistent cache enabled at: {directory}")
+    
+    def get(self, key: bytes) -> Optional[Any]:
+        """
+        Look up a cached value.
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            The cached value, or None on a miss
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        
+        if self._disk is not None:
+            value = self._disk.get(key)
+            if value is not None:
+                self._remember(key, value)
+            return value
+        
+        return None
+    
+    def set(self, key: bytes, value: Any) -> None:
+        """
+        Store a value.
+        
+        Args:
+            key: Cache key
+            value: Value to cache (must be picklable if disk-backed)
+        """
+        self._remember(key, value)
+        if self._disk is not None:
+            self._disk.set(key, value)
+    
+    def _remember(self, key: bytes, value: Any) -> None:
+        """Insert into the in-memory LRU, evicting the oldest entry if full."""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache over sentence embeddings.
+    
+    Each value is stored under a scope (e.g. a hash of the conversation so
+    far) together with the embedding of its text; a lookup returns the value
+    of the most similar text in the same scope if the cosine similarity
+    reaches ``threshold``. Without ``sentence-transformers``/``faiss`` the
+    cache is disabled and every lookup misses.
+    
+    Embedding costs tens of milliseconds of CPU per text, so async code
+    should use ``aget``/``aset``, which run in a worker thread; the index
+    is guarded by a lock.
+    
+    Attributes:
+        threshold (float): Minimum cosine similarity for a hit
+        maxsize (int): Maximum number of entries (oldest evicted first)
+        enabled (bool): Whether the embedding backend is available
+    """
+    
+    DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+    
+    # Neighbours inspected per lookup (entries from other scopes are skipped)
+    SEARCH_K = 8
+    
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL,
+        threshold: float = 0.95,
+        maxsize: int = 4096
+    ):
+        """
+        Initialize cache and load the embedding model.
+        
+        Args:
+            model_name: sentence-transformers model used for embeddings
+            threshold: Minimum cosine similarity for a hit
+            maxsize: Maximum number of entries
+        """
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.enabled = False
+        self._entries: "OrderedDict[int, Tuple[bytes, Any]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        
+        if faiss is None:
+            logger.warning("sentence-transformers/faiss not installed - semantic cache disabled")
+            return
+        
+        self._model = SentenceTransformer(model_name)
+        dimension = self._model.get_sentence_embedding_dimension()
+        # Inner product over normalized embeddings is cosine similarity
+        self._index = faiss.IndexIDMap(faiss.IndexFlatIP(dimension))
+        self.enabled = True
+        logger.info(f"Semantic cache enabled with model: {model_name}")
+    
+    def get(self, scope: bytes, text: str) -> Optional[Any]:
+        """
+        Look up the value cached for the most similar text in ``scope``.
+        
+        Args:
+            scope: Key the stored entry must share
+            text: Text to match
+        
+        Returns:
+            The cached value, or None on a miss
+        """
+        if not self.enabled or not self._entries:
+            return None
+        
+        embedding = self._embed(text)
+        with self._lock:
+            scores, ids = self._index.search(embedding, min(self.SEARCH_K, len(self._entries)))
+            for score, entry_id in zip(scores[0], ids[0]):
+                if score < self.threshold:
+                    break
+                entry = self._entries.get(int(entry_id))
+                if entry is not None and entry[0] == scope:
+                    return entry[1]
+        return None
+    
+    def set(self, scope: bytes, text: str, value: Any) -> None:
+        """
+        Store a value for ``text`` in ``scope``.
+        
+        Args:
+            scope: Key lookups must share to hit this entry
+            text: Text whose embedding indexes the entry
+            value: Value to cache
+        """
+        if not self.enabled:
+            return
+        
+        embedding = self._embed(text)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(embedding, np.array([entry_id], dtype="int64"))
+            self._entries[entry_id] = (scope, value)
+            
+            if len(self._entries) > self.maxsize:
+                oldest, _ = self._entries.popitem(last=False)
+                self._index.remove_ids(np.array([oldest], dtype="int64"))
+    
+    async def aget(self, scope: bytes, text: str) -> Optional[Any]:
+        """``get`` in a worker thread, keeping the event loop free."""
+        if not self.enabled or not self._entries:
+            return None
+        return await asyncio.to_thread(self.get, scope, text)
+    
+    async def aset(self, scope: bytes, text: str, value: Any) -> None:
+        """``set`` in a worker thread, keeping the event loop free."""
+        if self.enabled:
+            await asyncio.to_thread(self.set, scope, text, value)
+    
+    def _embed(self, text: str) -> "np.ndarray":
+        """Embed one text as a normalized float32 row vector."""
+        embedding = self._model.encode([normalize_text(text)], normalize_embeddings=True)
+        return np.asarray(embedding, dtype="float32")
+
+
+class _Flight:
+    """A shared computation and the number of callers awaiting it."""
+    
+    __slots__ = ("task", "waiters")
+    
+    def __init__(self, task: "asyncio.Future"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent async calls for the same key into one.
+    
+    The first caller for a key starts the computation; callers arriving
+    while it runs await the same result (or exception). The key is
+    forgotten as soon as the computation finishes, so later calls start a
+    new one (results are meant to be memoized by a cache in front of this).
+    
+    A caller cancelling only stops its own wait; the computation is
+    cancelled once no caller is left waiting for it.
+    """
+    
+    def __init__(self):
+        """Initialize with no computations in flight."""
+        self._flights: Dict[bytes, _Flight] = {}
+    
+    async def run(self, key: bytes, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await the computation for ``key``, starting it if none is running.
+        
+        Args:
+            key: Identity of the computation (e.g. a ``message_key``)
+            factory: Called with no arguments to start the computation
+        
+        Returns:
+            The computation's result
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                # Every caller gave up; stop the shared work
+                flight.task.cancel()
+                self._forget(key, flight)
+    
+    def _forget(self, key: bytes, flight: _Flight) -> None:
+        """Drop ``flight`` unless a newer computation replaced it."""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
@@ -1,16 +1,80 @@
+import os
+import glob
+import random
+import asyncio
+import threading
+import time
+import httpx
 import requests
-import json
-from typing import List, Dict
+import orjson
+import logging
+from typing import List, Dict, Optional, Set
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
 
 GUVI_CALLBACK_URL = "https://hackathon.guvi.in/api/updateHoneyPotFinalResult"
 
-def send_final_result(session_id: str, 
-                      scam_detected: bool, 
-                      total_messages: int, 
-                      intelligence: dict, 
-                      agent_notes: str = "Scam detected and intelligence extracted."):
+# Undelivered callbacks are appended here and retried by a background worker
+CALLBACK_QUEUE_PATH = os.getenv("CALLBACK_QUEUE_PATH", "callback_queue.jsonl")
+RETRY_INTERVAL_SECONDS = 30
+
+# In-process retries before a payload is handed to the queue
+CALLBACK_MAX_RETRIES = 3
+CALLBACK_BACKOFF_FACTOR = 0.5
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Seconds shutdown waits for in-flight callbacks before queueing them
+SHUTDOWN_GRACE_SECONDS = 10
+
+# Queued payloads still failing after this many drains are dead-lettered
+CALLBACK_MAX_QUEUE_ATTEMPTS = 20
+CALLBACK_DEAD_LETTER_PATH = f"{CALLBACK_QUEUE_PATH}.dead"
+
+# Delivery outcomes: only RETRY is worth queueing (REJECTED is a
+# non-retryable response such as 400/404, which would fail forever)
+DELIVERED = "delivered"
+RETRY = "retry"
+REJECTED = "rejected"
+
+# Reuse one keep-alive connection pool for queue drains (worker thread)
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32))
+
+# Pooled async client for live callbacks, bound to the running event loop
+_async_client: Optional[httpx.AsyncClient] = None
+_async_loop: Optional[asyncio.AbstractEventLoop] = None
+_pending: Set[asyncio.Task] = set()
+
+_QUEUE_LOCK = threading.Lock()
+_retry_worker = None
+
+def dispatch_final_result(**kwargs) -> asyncio.Task:
+    """
+    Runs ``send_final_result`` in the background on the running event loop.
+    
+    A reference to the task is kept until it finishes, and pending tasks
+    are awaited (or queued) by ``aclose_callback_client`` on shutdown.
+    """
+    task = asyncio.get_running_loop().create_task(send_final_result(**kwargs))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+    return task
+
+async def send_final_result(session_id: str,
+                            scam_detected: bool,
+                            total_messages: int,
+                            intelligence: dict,
+                            agent_notes: str = "Scam detected and intelligence extracted.") -> bool:
     """
     Sends the final extracted intelligence to the mandated callback URL.
+    
+    Rate limits, 5xx responses and connection errors are retried with
+    exponential backoff. If delivery still fails (or is cancelled) the
+    payload is persisted to the retry queue, so it is delivered at least
+    once even across restarts. Other error responses are not retried.
+    
+    Returns True if delivered without going through the queue.
     """
     payload = {
         "sessionId": session_id,
@@ -27,11 +91,264 @@ def send_final_result(session_id: str,
     }
     
     try:
-        print(f"[Callback] Sending result for session {session_id}...")
-        response = requests.post(GUVI_CALLBACK_URL, json=payload, timeout=5)
+        outcome = await _apost(payload)
+    except asyncio.CancelledError:
+        _enqueue([_queue_entry(payload)])  # shutting down mid-delivery
+        raise
+    
+    if outcome == DELIVERED:
+        return True
+    if outcome == RETRY:
+        _enqueue([_queue_entry(payload)])
+        start_retry_worker()
+    return False
+
+def _get_async_client() -> httpx.AsyncClient:
+    """
+    Returns the shared async client, (re)creating it for the running loop.
+    """
+    global _async_client, _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop:
+        if _async_client is not None:
+            _discard_async_client(_async_client, _async_loop)
+        _async_client = httpx.AsyncClient(
+            timeout=5.0,
+            limits=httpx.Limits(max_keepalive_connections=32)
+        )
+        _async_loop = loop
+    return _async_client
+
+def _discard_async_client(client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop) -> None:
+    """
+    Closes a client that belongs to another event loop.
+    
+    Its connections can only be closed on their own loop, so this happens
+    there if that loop is still running; a client whose loop has finished
+    can no longer be closed (call ``aclose_callback_client`` before it ends).
+    """
+    if loop is not None and loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    else:
+        logger.debug("Dropped callback client of a finished event loop")
+
+async def open_callback_client() -> httpx.AsyncClient:
+    """
+    Creates the callback client on the running event loop (call at startup).
+    """
+    return _get_async_client()
+
+async def aclose_callback_client() -> None:
+    """
+    Waits briefly for in-flight callbacks, then closes the client.
+    
+    Callbacks still running after ``SHUTDOWN_GRACE_SECONDS`` are cancelled,
+    which persists them to the retry queue.
+    """
+    global _async_client, _async_loop
+    if _pending:
+        _, still_running = await asyncio.wait(set(_pending), timeout=SHUTDOWN_GRACE_SECONDS)
+        for task in still_running:
+            task.cancel()
+        await asyncio.gather(*still_running, return_exceptions=True)
+    
+    if _async_client is not None:
+        await _async_client.aclose()
+    _async_client = None
+    _async_loop = None
+
+async def _apost(payload: dict) -> str:
+    """
+    POSTs one callback payload with retries.
+    
+    Returns DELIVERED on HTTP 200, REJECTED on a non-retryable status and
+    RETRY once retries for rate limits, 5xx and network errors run out.
+    """
+    session_id = payload.get("sessionId")
+    client = _get_async_client()
+    body = orjson.dumps(payload)
+    
+    for attempt in range(CALLBACK_MAX_RETRIES + 1):
+        try:
+            logger.debug("Sending callback for session %s...", session_id)
+            response = await client.post(
+                GUVI_CALLBACK_URL,
+                content=body,
+                headers={"Content-Type": "application/json"}
+            )
+            if response.status_code == 200:
+                logger.info("Callback delivered for session %s", session_id)
+                return DELIVERED
+            logger.warning("Callback for session %s failed with status %s", session_id, response.status_code)
+            if response.status_code not in RETRY_STATUS_CODES:
+                return REJECTED
+        except httpx.HTTPError as e:
+            logger.warning("Callback for session %s failed: %s", session_id, e)
+        
+        if attempt < CALLBACK_MAX_RETRIES:
+            await asyncio.sleep(
+                CALLBACK_BACKOFF_FACTOR * (2 ** attempt) + random.uniform(0, CALLBACK_BACKOFF_FACTOR)
+            )
+    return RETRY
+
+def _post(payload: dict) -> str:
+    """
+    POSTs one callback payload (blocking, used by the queue drain).
+    
+    Returns DELIVERED on HTTP 200, REJECTED on a non-retryable status and
+    RETRY on rate limits, 5xx and network errors.
+    """
+    session_id = payload.get("sessionId")
+    try:
+        logger.debug("Sending callback for session %s...", session_id)
+        response = _SESSION.post(
+            GUVI_CALLBACK_URL,
+            data=orjson.dumps(payload),
+            headers={"Content-Type": "application/json"},
+            timeout=5
+        )
         if response.status_code == 200:
-            print("[Callback] Success.")
-        else:
-            print(f"[Callback] Failed with Status {response.status_code}")
+            logger.info("Callback delivered for session %s", session_id)
+            return DELIVERED
+        logger.warning("Callback for session %s failed with status %s", session_id, response.status_code)
+        if response.status_code not in RETRY_STATUS_CODES:
+            return REJECTED
     except Exception as e:
-        print(f"[Callback] Exception: {e}")
+        logger.warning("Callback for session %s failed: %s", session_id, e)
+    return RETRY
+
+def _queue_entry(payload: dict, attempts: int = 0) -> Dict:
+    """
+    Wraps a payload with the number of queued delivery attempts so far.
+    """
+    return {"attempts": attempts, "payload": payload}
+
+def _append(path: str, entries: List[Dict]) -> None:
+    with _QUEUE_LOCK:
+        with open(path, "ab") as queue_file:
+            for entry in entries:
+                queue_file.write(orjson.dumps(entry) + b"\n")
+
+def _enqueue(entries: List[Dict]) -> None:
+    """
+    Appends queue entries to the on-disk retry queue (one JSON object per line).
+    """
+    if not entries:
+        return
+    _append(CALLBACK_QUEUE_PATH, entries)
+    logger.info("Queued %d callback payload(s) for retry", len(entries))
+
+def _dead_letter(entries: List[Dict]) -> None:
+    """
+    Moves entries that will not be retried to the dead-letter file.
+    """
+    if not entries:
+        return
+    _append(CALLBACK_DEAD_LETTER_PATH, entries)
+    logger.error("Dead-lettered %d callback payload(s) to %s", len(entries), CALLBACK_DEAD_LETTER_PATH)
+
+def _claim_path(pid: int) -> str:
+    return f"{CALLBACK_QUEUE_PATH}.{pid}.draining"
+
+def _read_claimed(path: str) -> List[Dict]:
+    """
+    Reads the entries of a claimed queue file.
+    
+    Bare payloads (queued before attempts were counted) start at 0 attempts.
+    """
+    entries = []
+    with open(path, "rb") as queue_file:
+        for line in queue_file:
+            try:
+                entry = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                if line.strip():
+                    logger.warning("Dropping malformed callback queue entry: %r", line[:80])
+                continue
+            if "payload" not in entry:
+                entry = _queue_entry(entry)
+            entries.append(entry)
+    return entries
+
+def _stale_claims() -> List[str]:
+    """
+    Lists claim files left by processes that died mid-drain.
+    """
+    paths = []
+    for path in glob.glob(_claim_path("*")):
+        try:
+            pid = int(path.rsplit(".", 2)[-2])
+            if pid != os.getpid():
+                os.kill(pid, 0)
+                continue  # owner is still alive and draining
+        except ProcessLookupError:
+            pass
+        except (ValueError, OSError):
+            continue
+        paths.append(path)
+    return paths
+
+def drain_retry_queue() -> int:
+    """
+    Retries every queued payload once; failures go back on the queue.
+    
+    The queue file is claimed with an atomic rename, so concurrent drains
+    (e.g. several server workers) never pick up the same entries. Claimed
+    files are only removed once every entry was delivered, re-queued or
+    dead-lettered; entries are dead-lettered when rejected with a
+    non-retryable status or after ``CALLBACK_MAX_QUEUE_ATTEMPTS`` failed
+    drains.
+    Returns the number of payloads delivered.
+    """
+    claims = _stale_claims()
+    
+    # Our own claim may survive a failed drain; finish it before claiming more
+    claim = _claim_path(os.getpid())
+    if claim not in claims:
+        with _QUEUE_LOCK:
+            try:
+                os.replace(CALLBACK_QUEUE_PATH, claim)
+                claims.append(claim)
+            except FileNotFoundError:
+                pass
+    
+    entries = [entry for path in claims for entry in _read_claimed(path)]
+    retry, dead = [], []
+    for entry in entries:
+        outcome = _post(entry["payload"])
+        if outcome == DELIVERED:
+            continue
+        entry["attempts"] += 1
+        if outcome == RETRY and entry["attempts"] < CALLBACK_MAX_QUEUE_ATTEMPTS:
+            retry.append(entry)
+        else:
+            dead.append(entry)
+    _enqueue(retry)
+    _dead_letter(dead)
+    
+    for path in claims:
+        os.remove(path)
+    return len(entries) - len(retry) - len(dead)
+
+def _retry_loop(interval: float) -> None:
+    while True:
+        try:
+            delivered = drain_retry_queue()
+            if delivered:
+                logger.info("Delivered %d queued callback payload(s)", delivered)
+        except Exception as e:
+            logger.error("Callback retry worker error: %s", e, exc_info=True)
+        time.sleep(interval)
+
+def start_retry_worker(interval: float = RETRY_INTERVAL_SECONDS) -> None:
+    """
+    Starts the background thread draining the retry queue (idempotent).
+    """
+    global _retry_worker
+    with _QUEUE_LOCK:
+        if _retry_worker is not None and _retry_worker.is_alive():
+            return
+        _retry_worker = threading.Thread(
+            target=_retry_loop, args=(interval,), name="callback-retry", daemon=True
+        )
+        _retry_worker.start()
@@ -1,33 +1,113 @@
 import re
 
+# RE2 guarantees linear-time matching on adversarial input. Its \w, \d and
+# \b are ASCII-only though, so only patterns whose classes can be spelled
+# out in Unicode run on it; the others stay on re (their repeats are
+# bounded, so they cannot backtrack catastrophically).
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+from app.utils.scanner import build_scanner
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Patterns that may run on RE2: (re source, equivalent RE2 source with \w
+# as [\p{L}\p{N}_] and \d as \p{Nd}, matching re's Unicode classes)
+UPI_PATTERN = (r"(?i)[\w\.-]+@[\w\.-]+", r"[\p{L}\p{N}_.-]+@[\p{L}\p{N}_.-]+")
+URL_PATTERN = (
+    r"https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+",
+    r"https?://(?:[-\p{L}\p{N}_.]|(?:%[\p{Nd}a-fA-F]{2}))+"
+)
+
+def _compile_linear(pattern: tuple):
+    """
+    Compiles a (re source, RE2 source) pair with RE2 when available.
+    """
+    if re2 is not None:
+        return re2.compile(pattern[1])
+    return re.compile(pattern[0])
+
 # Extraction Regex Patterns
-UPI_REGEX = re.compile(r"[\w\.-]+@[\w\.-]+", re.IGNORECASE)
+UPI_REGEX = _compile_linear(UPI_PATTERN)
 BANK_ACCOUNT_REGEX = re.compile(r"\b\d{11,18}\b") # More specific for bank accounts (usually 11+ digits)
-URL_REGEX = re.compile(r"https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+")
+URL_REGEX = _compile_linear(URL_PATTERN)
 PHONE_REGEX = re.compile(r"(?:\+91|91|0)?[6-9]\d{9}\b")
+
 KEYWORDS = ["blocked", "urgent", "immediately", "suspend", "verify", "kyc", "pin", "otp", "login", "password"]
+KEYWORDS_LOWER = tuple(word.lower() for word in KEYWORDS)
+
+# Scanner names of the keyword literals
+_KEYWORD_IDS = tuple((word, f"keyword:{word}") for word in KEYWORDS_LOWER)
+
+# One-pass prefilter over entity patterns and keywords: findall passes run
+# only for the entity patterns that (may) occur, and keyword hits are exact
+_scan_entities = build_scanner({
+    # re sources: Hyperscan's UCP mode gives \w and \d re's Unicode meaning
+    "upi_ids": (UPI_PATTERN[0], 0),
+    "bank_accounts": (BANK_ACCOUNT_REGEX.pattern, 0),
+    "phishing_urls": (URL_PATTERN[0], 0),
+    "phone_numbers": (PHONE_REGEX.pattern, 0),
+    **{scan_id: ("(?i)" + re.escape(word), 0) for word, scan_id in _KEYWORD_IDS},
+}, prefilter=True, label="entity extraction")
+
+# Single-pass substring matcher over all keywords (None without pyahocorasick)
+_KEYWORD_AUTOMATON = None
+if ahocorasick is not None:
+    _KEYWORD_AUTOMATON = ahocorasick.Automaton()
+    for word in KEYWORDS_LOWER:
+        _KEYWORD_AUTOMATON.add_word(word, word)
+    _KEYWORD_AUTOMATON.make_automaton()
+
+def find_keywords(text: str) -> list:
+    """
+    Returns the KEYWORDS occurring (case-insensitively) in the text, in KEYWORDS order.
+    """
+    lowered = text.lower()
+    if _KEYWORD_AUTOMATON is not None:
+        found = {word for _, word in _KEYWORD_AUTOMATON.iter(lowered)}
+        return [word for word in KEYWORDS_LOWER if word in found]
+    return [word for word in KEYWORDS_LOWER if word in lowered]
 
 def extract_intelligence(text: str) -> dict:
     """
     Extracts structured entities from the text using Regex.
     """
+    # Patterns present in the text (None means run every pattern)
+    present = _scan_entities(text) if _scan_entities is not None else None
+    
+    def findall(name, regex):
+        if present is not None and name not in present:
+            return []
+        return regex.findall(text)
+    
+    if present is not None:
+        keywords = [word for word, scan_id in _KEYWORD_IDS if scan_id in present]
+    else:
+        keywords = find_keywords(text)
+    
     # Clean up UPI ids (remove trailing periods often found in sentences)
-    upi_ids = [upi.rstrip('.') for upi in UPI_REGEX.findall(text)]
+    upi_ids = list(dict.fromkeys(upi.rstrip('.') for upi in findall("upi_ids", UPI_REGEX)))
     
     # Strip trailing periods from URLs
-    phishing_urls = [url.rstrip('.') for url in URL_REGEX.findall(text)]
+    phishing_urls = list(dict.fromkeys(url.rstrip('.') for url in findall("phishing_urls", URL_REGEX)))
     
-    # Extract phone numbers first
-    phone_numbers = list(set(PHONE_REGEX.findall(text)))
+    phone_numbers = list(dict.fromkeys(findall("phone_numbers", PHONE_REGEX)))
     
-    # Extract bank accounts, ensuring they are not also captured as phone numbers
-    all_digit_sequences = BANK_ACCOUNT_REGEX.findall(text)
-    bank_accounts = [acc for acc in all_digit_sequences if acc not in phone_numbers]
+    # Extract bank accounts, routing digit runs that are really phone numbers away
+    bank_accounts = list(dict.fromkeys(
+        acc for acc in findall("bank_accounts", BANK_ACCOUNT_REGEX)
+        if not PHONE_REGEX.fullmatch(acc)
+    ))
     
     return {
-        "upi_ids": list(set(upi_ids)),
-        "bank_accounts": list(set(bank_accounts)),
-        "phishing_urls": list(set(phishing_urls)),
+        "upi_ids": upi_ids,
+        "bank_accounts": bank_accounts,
+        "phishing_urls": phishing_urls,
         "phone_numbers": phone_numbers,
-        "suspicious_keywords": [word for word in KEYWORDS if word.lower() in text.lower()]
+        "suspicious_keywords": keywords
     }
@@ -3,44 +3,127 @@ LLM Client - Groq API Integration
 
 Handles communication with Groq LLM API for scam detection and agent engagement.
 Automatically detects Groq API keys and routes to appropriate endpoint.
+Set ``LLM_BASE_URL`` to use any OpenAI-compatible server instead (e.g. a
+self-hosted vLLM with continuous batching and prefix caching).
+
+Entry points:
+- ``call_openrouter``: blocking call built on ``requests``
+- ``acall_openrouter``: coroutine built on a shared ``httpx.AsyncClient`` so
+  many sessions can be multiplexed on one event loop
+- ``stream_openrouter``: async generator yielding content deltas from the
+  provider's SSE stream as they are generated
+- ``acall_openrouter_json``: streams a JSON answer and returns as soon as
+  the accumulated text parses
+
+The async client is created lazily; servers should call
+``open_async_client`` / ``aclose_async_client`` from their lifespan so
+connections are opened up front and closed cleanly on shutdown.
 """
 
 import os
+import asyncio
+import random
 import requests
-import json
+import httpx
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+import orjson
 import logging
-from typing import Optional
+from typing import Optional, Dict, Any, Tuple, AsyncIterator, List
+
+try:
+    import h2  # enables HTTP/2 in httpx
+except ImportError:
+    h2 = None
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of in-flight async LLM requests (respects provider rate limits)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+# Connection pool limits of the async client
+LLM_MAX_CONNECTIONS = 100
+LLM_MAX_KEEPALIVE_CONNECTIONS = 20
+
+# Retry policy for transient failures (rate limits, 5xx, timeouts)
+LLM_MAX_RETRIES = 3
+LLM_BACKOFF_FACTOR = 0.4
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# (connect, read) timeouts in seconds; long completions can exceed 5s
+LLM_CONNECT_TIMEOUT = 3
+LLM_READ_TIMEOUT = 30
+
+# Fallback responses for stability
+FALLBACK_RESPONSES = [
+    "I am not understanding nicely. My grandson handles these things usually.",
+    "Sir, I am a retired person. Please explain slowly.",
+    "Why is it so urgent? I need to ask my son first.",
+    "I am trying to open the link but it is not working properly."
+]
+
+# Shared keep-alive session for blocking calls (one TCP+TLS handshake per host)
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=LLM_MAX_RETRIES,
+        backoff_factor=LLM_BACKOFF_FACTOR,
+        backoff_jitter=LLM_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        respect_retry_after_header=True,
+        allowed_methods=None  # retry POST as well
+    )
+)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)  # self-hosted servers on a private network
+
+# Shared async client and concurrency cap, bound to the running event loop
+_async_client: Optional[httpx.AsyncClient] = None
+_async_semaphore: Optional[asyncio.Semaphore] = None
+_async_loop: Optional[asyncio.AbstractEventLoop] = None
 
-def call_openrouter(prompt: str, system_prompt: Optional[str] = None, model: str = None) -> str:
+
+def _build_request(
+    prompt: str,
+    system_prompt: Optional[str] = None,
+    model: str = None,
+    history: Optional[List[Dict[str, str]]] = None
+) -> Optional[Tuple[str, Dict[str, str], Dict[str, Any]]]:
     """
-    Makes a request to Groq LLM API.
+    Build target URL, headers and payload for a chat completion request.
+    
+    Messages are ordered system prompt, history, prompt, so requests that
+    share a system prompt share a token prefix (reusable by servers with
+    prefix caching).
     
     Args:
         prompt: User prompt / message to analyze
         system_prompt: Optional system instructions for the LLM
         model: Optional model override (defaults to LLM_MODEL env var)
+        history: Optional earlier chat messages (``role``/``content`` dicts)
         
     Returns:
-        str: LLM response text or fallback response on error
+        Tuple of (url, headers, payload), or None if no API key is configured
     """
     api_key = os.getenv("LLM_API_KEY")
-    if not api_key:
+    base_url = os.getenv("LLM_BASE_URL")
+    if not api_key and not base_url:
         logger.error("LLM_API_KEY not found in environment")
-        return "Error: No LLM_API_KEY found."
+        return None
     
     target_model = model or os.getenv("LLM_MODEL", "llama-3.3-70b-versatile")
     
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
+    headers = {"Content-Type": "application/json"}
+    if api_key:  # self-hosted servers may not require one
+        headers["Authorization"] = f"Bearer {api_key}"
     
     messages = []
     if system_prompt:
         messages.append({"role": "system", "content": system_prompt})
+    if history:
+        messages.extend(history)
     messages.append({"role": "user", "content": prompt})
     
     payload = {
@@ -50,53 +133,392 @@ def call_openrouter(prompt: str, system_prompt: Optional[str] = None, model: str
         "max_tokens": 1000
     }
     
-    # Auto-detect API endpoint based on key format
-    target_url = "https://openrouter.ai/api/v1/chat/completions"
-    if api_key.startswith("gsk_"):
+    # Explicit OpenAI-compatible server, else auto-detect based on key format
+    if base_url:
+        target_url = f"{base_url.rstrip('/')}/chat/completions"
+    elif api_key.startswith("gsk_"):
         target_url = "https://api.groq.com/openai/v1/chat/completions"
+    else:
+        target_url = "https://openrouter.ai/api/v1/chat/completions"
     
-    logger.debug(f"Calling LLM API: {target_url}")
+    return target_url, headers, payload
+
+
+def _extract_content(data: Dict[str, Any]) -> Optional[str]:
+    """Return the first choice's message content, or None if absent."""
+    if "choices" in data and len(data["choices"]) > 0:
+        return data["choices"][0]["message"]["content"]
+    return None
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    Seconds to wait before retry number ``attempt + 1``.
     
-    import time
+    Honors a numeric ``Retry-After`` header (sent by Groq on 429), otherwise
+    uses exponential backoff with random jitter.
     
-    max_retries = 1
-    for attempt in range(max_retries):
+    Args:
+        attempt: Zero-based index of the attempt that just failed
+        retry_after: Value of the response's Retry-After header, if any
+        
+    Returns:
+        float: Delay in seconds
+    """
+    if retry_after:
         try:
-            response = requests.post(target_url, headers=headers, json=payload, timeout=5)
-            
-            # Handle rate limiting
-            if response.status_code == 429:
-                if attempt < max_retries - 1:
-                    logger.warning(f"Rate limited (429). Retrying in 1s... ({attempt+1}/{max_retries})")
-                    time.sleep(1)
-                    continue
-                else:
-                    raise Exception("Rate limit (429) exceeded")
-            
-            response.raise_for_status()
-            data = response.json()
-            
-            if "choices" in data and len(data["choices"]) > 0:
-                result = data["choices"][0]["message"]["content"]
-                logger.debug(f"LLM response received: {result[:50]}...")
-                return result
-            
-            logger.error("Invalid LLM response structure")
-            return "Error: Invalid response from LLM API."
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            pass
+    return LLM_BACKOFF_FACTOR * (2 ** attempt) + random.uniform(0, LLM_BACKOFF_FACTOR)
+
+
+async def _apost_with_retries(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    url: str,
+    headers: Dict[str, str],
+    payload: Dict[str, Any]
+) -> httpx.Response:
+    """
+    POST with retries on retryable status codes and transport errors.
+    
+    Returns:
+        httpx.Response: The first non-retryable response, or the last one
+        
+    Raises:
+        httpx.TransportError: If the final attempt fails at the transport level
+    """
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            async with semaphore:
+                response = await client.post(url, headers=headers, content=orjson.dumps(payload))
+            if response.status_code not in RETRY_STATUS_CODES or attempt == LLM_MAX_RETRIES:
+                return response
+            delay = _retry_delay(attempt, response.headers.get("Retry-After"))
+            reason = f"status {response.status_code}"
+        except httpx.TransportError as e:
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            delay = _retry_delay(attempt)
+            reason = type(e).__name__
+        
+        logger.warning(
+            "LLM request failed (%s). Retrying in %.2fs... (%d/%d)",
+            reason, delay, attempt + 1, LLM_MAX_RETRIES
+        )
+        await asyncio.sleep(delay)
+
+
+def _get_async_resources() -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+    """
+    Return the shared async client and semaphore for the running event loop.
+    
+    Both objects are tied to the loop they were first used on, so they are
+    recreated if a different loop is running; the previous client is closed
+    (see ``_discard_async_client``).
+    """
+    global _async_client, _async_semaphore, _async_loop
+    
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop:
+        if _async_client is not None:
+            _discard_async_client(_async_client, _async_loop)
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            http2=h2 is not None
+        )
+        _async_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        _async_loop = loop
+    return _async_client, _async_semaphore
+
+
+def _discard_async_client(client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop) -> None:
+    """
+    Close a client that belongs to another event loop.
+    
+    Its connections can only be closed on their own loop, so this happens
+    there if that loop is still running. A client whose loop has already
+    finished cannot be closed any more; code that runs its own loops must
+    call ``aclose_async_client`` before the loop ends.
+    """
+    if loop is not None and loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    else:
+        logger.debug("Dropped async LLM client of a finished event loop")
+
+
+async def open_async_client() -> httpx.AsyncClient:
+    """
+    Create the shared async client on the running event loop.
+    
+    Returns:
+        httpx.AsyncClient: The client used by the async entry points
+    """
+    client, _ = _get_async_resources()
+    logger.info(f"Async LLM client ready (HTTP/2: {h2 is not None})")
+    return client
+
+
+async def aclose_async_client() -> None:
+    """Close the shared async client and release its connections."""
+    global _async_client, _async_semaphore, _async_loop
+    
+    if _async_client is not None:
+        await _async_client.aclose()
+    _async_client = None
+    _async_semaphore = None
+    _async_loop = None
+
+
+def call_openrouter(
+    prompt: str,
+    system_prompt: Optional[str] = None,
+    model: str = None,
+    history: Optional[List[Dict[str, str]]] = None
+) -> str:
+    """
+    Makes a request to Groq LLM API.
+    
+    Args:
+        prompt: User prompt / message to analyze
+        system_prompt: Optional system instructions for the LLM
+        model: Optional model override (defaults to LLM_MODEL env var)
+        history: Optional earlier chat messages (``role``/``content`` dicts)
+        
+    Returns:
+        str: LLM response text or fallback response on error
+    """
+    request = _build_request(prompt, system_prompt, model, history)
+    if request is None:
+        return "Error: No LLM_API_KEY found."
+    target_url, headers, payload = request
+    
+    logger.debug("Calling LLM API: %s", target_url)
+    
+    try:
+        # Retries with backoff (429/5xx, honoring Retry-After) happen in the adapter
+        response = _SESSION.post(
+            target_url,
+            headers=headers,
+            data=orjson.dumps(payload),
+            timeout=(LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT)
+        )
+        response.raise_for_status()
+        result = _extract_content(orjson.loads(response.content))
+        
+        if result is not None:
+            logger.debug("LLM response received: %.50s...", result)
+            return result
+        
+        logger.error("Invalid LLM response structure")
+        return "Error: Invalid response from LLM API."
+        
+    except Exception as e:
+        error_msg = str(e)
+        if hasattr(e, 'response') and e.response is not None:
+            logger.error("LLM API error: %s", e.response.text)
+        
+        logger.warning("LLM call failed: %s - Using fallback response", error_msg)
+        return random.choice(FALLBACK_RESPONSES)
+
+
+async def acall_openrouter(
+    prompt: str,
+    system_prompt: Optional[str] = None,
+    model: str = None,
+    history: Optional[List[Dict[str, str]]] = None
+) -> str:
+    """
+    Async variant of ``call_openrouter`` using a shared ``httpx.AsyncClient``.
+    
+    Concurrency is capped by a semaphore (``LLM_MAX_CONCURRENCY``) shared
+    across all callers on the event loop. Rate limits, 5xx responses and
+    transport errors are retried with exponential backoff and jitter.
+    
+    Args:
+        prompt: User prompt / message to analyze
+        system_prompt: Optional system instructions for the LLM
+        model: Optional model override (defaults to LLM_MODEL env var)
+        history: Optional earlier chat messages (``role``/``content`` dicts)
+        
+    Returns:
+        str: LLM response text or fallback response on error
+    """
+    request = _build_request(prompt, system_prompt, model, history)
+    if request is None:
+        return "Error: No LLM_API_KEY found."
+    target_url, headers, payload = request
+    
+    logger.debug("Calling LLM API (async): %s", target_url)
+    
+    client, semaphore = _get_async_resources()
+    
+    try:
+        response = await _apost_with_retries(client, semaphore, target_url, headers, payload)
+        response.raise_for_status()
+        result = _extract_content(orjson.loads(response.content))
+        
+        if result is not None:
+            logger.debug("LLM response received: %.50s...", result)
+            return result
+        
+        logger.error("Invalid LLM response structure")
+        return "Error: Invalid response from LLM API."
+        
+    except Exception as e:
+        if isinstance(e, httpx.HTTPStatusError):
+            logger.error("LLM API error: %s", e.response.text)
+        
+        logger.warning("LLM call failed: %s - Using fallback response", e)
+        return random.choice(FALLBACK_RESPONSES)
+
+
+async def stream_openrouter(
+    prompt: str,
+    system_prompt: Optional[str] = None,
+    model: str = None,
+    history: Optional[List[Dict[str, str]]] = None
+) -> AsyncIterator[str]:
+    """
+    Stream a chat completion, yielding content deltas as they arrive.
+    
+    Uses the provider's server-sent events mode (``stream: true``) so callers
+    can start forwarding text before generation finishes. Failures before
+    the first delta are retried like ``acall_openrouter``.
+    
+    A stream only counts as complete once it sends ``[DONE]`` or a
+    ``finish_reason``. If it breaks off after content was yielded, the
+    error is raised so callers never mistake the partial text for a whole
+    reply.
+    
+    Args:
+        prompt: User prompt / message to analyze
+        system_prompt: Optional system instructions for the LLM
+        model: Optional model override (defaults to LLM_MODEL env var)
+        history: Optional earlier chat messages (``role``/``content`` dicts)
+        
+    Yields:
+        str: Content deltas; a single fallback response if the request fails
+        before any content was produced
+        
+    Raises:
+        Exception: If the stream fails or ends early after content was yielded
+    """
+    request = _build_request(prompt, system_prompt, model, history)
+    if request is None:
+        yield "Error: No LLM_API_KEY found."
+        return
+    target_url, headers, payload = request
+    payload["stream"] = True
+    
+    logger.debug("Streaming from LLM API: %s", target_url)
+    
+    client, semaphore = _get_async_resources()
+    produced = False
+    
+    try:
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                async with semaphore:
+                    async with client.stream("POST", target_url, headers=headers, content=orjson.dumps(payload)) as response:
+                        if response.status_code in RETRY_STATUS_CODES and attempt < LLM_MAX_RETRIES:
+                            delay = _retry_delay(attempt, response.headers.get("Retry-After"))
+                            reason = f"status {response.status_code}"
+                        else:
+                            if response.status_code >= 400:
+                                await response.aread()
+                            response.raise_for_status()
+                            
+                            finished = False
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[len("data:"):].strip()
+                                if data == "[DONE]":
+                                    finished = True
+                                    break
+                                
+                                choices = orjson.loads(data).get("choices") or [{}]
+                                delta = choices[0].get("delta", {}).get("content")
+                                if delta:
+                                    produced = True
+                                    yield delta
+                                if choices[0].get("finish_reason"):
+                                    finished = True
+                            
+                            if not finished:
+                                raise httpx.RemoteProtocolError("LLM stream ended before completion")
+                            return
+                            
+            except httpx.TransportError as e:
+                # Never retry once content has been forwarded to the caller
+                if produced or attempt == LLM_MAX_RETRIES:
+                    raise
+                delay = _retry_delay(attempt)
+                reason = type(e).__name__
             
-        except Exception as e:
-            error_msg = str(e)
-            if hasattr(e, 'response') and e.response is not None:
-                logger.error(f"LLM API error: {e.response.text}")
+            logger.warning(
+                "LLM stream failed (%s). Retrying in %.2fs... (%d/%d)",
+                reason, delay, attempt + 1, LLM_MAX_RETRIES
+            )
+            await asyncio.sleep(delay)
             
-            logger.warning(f"LLM call failed: {error_msg} - Using fallback response")
+    except Exception as e:
+        if isinstance(e, httpx.HTTPStatusError):
+            logger.error("LLM API error: %s", e.response.text)
+        
+        if produced:
+            # Part of the reply is out; ending quietly would look complete
+            logger.warning("LLM stream interrupted: %s", e)
+            raise
+        
+        logger.warning("LLM stream failed: %s - Using fallback response", e)
+        yield random.choice(FALLBACK_RESPONSES)
+
+
+async def acall_openrouter_json(
+    prompt: str,
+    system_prompt: Optional[str] = None,
+    model: str = None
+) -> str:
+    """
+    Stream a completion that is expected to be JSON and return it early.
+    
+    Deltas are collected in a list and only joined/parsed when the latest
+    one ends with a closing brace or bracket, keeping accumulation O(n).
+    The stream is closed as soon as the text parses, so trailing output
+    after the JSON is never waited for.
+    
+    Args:
+        prompt: User prompt / message to analyze
+        system_prompt: Optional system instructions for the LLM
+        model: Optional model override (defaults to LLM_MODEL env var)
+        
+    Returns:
+        str: Raw response text (possibly incomplete JSON if parsing never succeeded)
+    """
+    chunks: List[str] = []
+    stream = stream_openrouter(prompt, system_prompt=system_prompt, model=model)
+    
+    try:
+        async for delta in stream:
+            chunks.append(delta)
+            if delta.rstrip()[-1:] not in ("}", "]"):
+                continue
             
-            # Fallback responses for stability
-            import random
-            fallbacks = [
-                "I am not understanding nicely. My grandson handles these things usually.",
-                "Sir, I am a retired person. Please explain slowly.",
-                "Why is it so urgent? I need to ask my son first.",
-                "I am trying to open the link but it is not working properly."
-            ]
-            return random.choice(fallbacks)
+            text = "".join(chunks)
+            try:
+                orjson.loads(text.replace("```json", "").replace("```", "").strip())
+            except ValueError:
+                continue
+            logger.debug("Complete JSON received - closing stream early")
+            return text
+    finally:
+        await stream.aclose()
+    
+    return "".join(chunks)
@@ -1,30 +1,80 @@
 import re
+from enum import IntFlag
 
-# Payment Keywords
-PAYMENT_PATTERNS = re.compile(r"(upi|bank|pay|transfer|paytm|gpay|phonepe|wallet|credit card|debit card)", re.IGNORECASE)
+from app.utils.scanner import build_scanner
 
-# Urgency Indicators
-URGENCY_PATTERNS = re.compile(r"(blocked|urgent|immediately|suspend|verify|kyc|24 hours|last chance|expired|action required)", re.IGNORECASE)
+class Signal(IntFlag):
+    """
+    Rule-based scam signals, combined into a bitmask.
+    """
+    PAYMENT = 1
+    URGENCY = 2
+    URL = 4
+    UPI_SCAM = 8
+
+ALL_SIGNALS = Signal.PAYMENT | Signal.URGENCY | Signal.URL | Signal.UPI_SCAM
 
-# URL Pattern (Simple)
-# Specific UPI Scam Phrases
-UPI_SCAM_PATTERNS = re.compile(r"(enter upi pin|receive money|scan qt|scan qr|refund.*upi|upi.*refund|upi id.*verify)", re.IGNORECASE)
+# Signal -> (pattern, flags)
+SIGNAL_PATTERNS = {
+    # Specific UPI Scam Phrases
+    Signal.UPI_SCAM: (r"(enter upi pin|receive money|scan qt|scan qr|refund.*upi|upi.*refund|upi id.*verify)", re.IGNORECASE),
+    # Payment Keywords
+    Signal.PAYMENT: (r"(upi|bank|pay|transfer|paytm|gpay|phonepe|wallet|credit card|debit card)", re.IGNORECASE),
+    # Urgency Indicators
+    Signal.URGENCY: (r"(blocked|urgent|immediately|suspend|verify|kyc|24 hours|last chance|expired|action required)", re.IGNORECASE),
+    # URL Pattern (Simple)
+    Signal.URL: (r"https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+", 0),
+}
 
-URL_PATTERN = re.compile(r"https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+")
+# Readable names for each signal (e.g. in analysis results and logs)
+SIGNAL_NAMES = {
+    Signal.PAYMENT: "payment_keywords",
+    Signal.URGENCY: "urgency_keywords",
+    Signal.URL: "contains_url",
+    Signal.UPI_SCAM: "upi_scam_specific",
+}
 
-def check_rule_based_signals(message: str) -> dict:
+# Without Hyperscan each category is searched separately: a plain search()
+# stops at the first hit, which beats one combined alternation tried at
+# every offset of the message. Bits are plain ints (OR'ed without IntFlag
+# overhead) and converted to a Signal once per call.
+_SIGNAL_SEARCHES = tuple(
+    (int(signal), re.compile(pattern, flags).search)
+    for signal, (pattern, flags) in SIGNAL_PATTERNS.items()
+)
+_SIGNAL_BITS = {signal.name: int(signal) for signal in SIGNAL_PATTERNS}
+_UPI_SCAM_BIT = int(Signal.UPI_SCAM)
+_PAYMENT_BIT = int(Signal.PAYMENT)
+
+# Hyperscan database over the same patterns (None if Hyperscan is unavailable)
+_scan_signals = build_scanner({
+    signal.name: pattern_flags for signal, pattern_flags in SIGNAL_PATTERNS.items()
+}, label="rule signals")
+
+def check_rule_based_signals(message: str) -> Signal:
     """
     Checks for presence of scam keywords and URLs.
+    
+    Returns a Signal bitmask of the signals found.
     """
-    signals = {
-        "payment_keywords": bool(PAYMENT_PATTERNS.search(message)),
-        "urgency_keywords": bool(URGENCY_PATTERNS.search(message)),
-        "contains_url": bool(URL_PATTERN.search(message)),
-        "upi_scam_specific": bool(UPI_SCAM_PATTERNS.search(message))
-    }
+    mask = 0
+    
+    if _scan_signals is not None:
+        for name in _scan_signals(message):
+            mask |= _SIGNAL_BITS[name]
+    else:
+        for bit, search in _SIGNAL_SEARCHES:
+            if search(message):
+                mask |= bit
     
     # Boost payment signal if specific UPI scam pattern is found
-    if signals["upi_scam_specific"]:
-        signals["payment_keywords"] = True
-        
-    return signals
+    if mask & _UPI_SCAM_BIT:
+        mask |= _PAYMENT_BIT
+    
+    return Signal(mask)
+
+def signals_to_dict(signals: int) -> dict:
+    """
+    Expands a Signal bitmask into a {name: bool} dict.
+    """
+    return {name: bool(signals & signal) for signal, name in SIGNAL_NAMES.items()}
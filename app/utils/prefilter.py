@@ -0,0 +1,173 @@
+"""
+Scam Prefilter - Cheap Lexical Gate Before Detection
+
+Benign traffic rarely contains the vocabulary scams depend on (payments,
+credentials, urgency, threats, prizes), so one keyword scan can skip the
+LLM pipeline for it entirely. The keyword list is deliberately broad - it
+covers the Sentinel rule vocabulary - because a miss drops a scam. Short
+keywords are matched on word boundaries, though, since each false hit costs
+a Sentinel call and a speculative Actor call.
+
+Uses a pyahocorasick automaton when installed, otherwise one compiled regex
+alternation. Hit-rate counters are kept to tune the list.
+"""
+
+import os
+import re
+import logging
+from typing import Dict
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+logger = logging.getLogger(__name__)
+
+# Set SCAM_PREFILTER=0 to send every message through detection
+PREFILTER_ENABLED = os.getenv("SCAM_PREFILTER", "true").lower() not in ("0", "false", "no")
+
+# Lowercase keywords; any match sends the message to the Sentinel. Short
+# tokens only count as whole words ("pin" but not "spinach"), stems only at
+# the start of a word ("pay" in "payment", not "repay"), and symbols, domains
+# and UPI handles anywhere
+SCAM_WORDS = (
+    # Payments and banking
+    "upi", "gpay", "phonepe", "bhim", "cvv", "a/c", "ifsc", "neft", "imps",
+    "fee", "fees", "money", "inr", "rs", "paisa", "khata", "scan", "qr",
+    "credit card", "debit card", "collect request",
+    # Credentials and identity
+    "pin", "otp", "kyc", "pan card", "sim", "update your", "link your",
+    # Urgency and threats
+    "turant", "24 hours", "last chance", "last warning", "action required",
+    "police", "court", "cbi", "customs", "income tax",
+    # Prizes, jobs and investments
+    "job", "jobs", "trading", "salary", "work from home", "part time",
+    # Links and remote access
+    "link", "apk",
+    # Couriers and parcels
+    "fedex", "delivery",
+)
+SCAM_STEMS = (
+    # Payments and banking
+    "bank", "pay", "transfer", "wallet", "account", "transaction", "refund",
+    "cashback", "deposit", "cash", "rupee", "lakh", "crore",
+    # Credentials and identity
+    "password", "login", "aadhaar", "aadhar", "verif",
+    # Urgency and threats
+    "block", "urgent", "immediate", "suspend", "expir", "deactivat",
+    "arrest", "warrant", "legal", "penalt", "electricity", "disconnect",
+    # Prizes, jobs and investments
+    "lotter", "prize", "winner", "reward", "gift", "offer", "congratulation",
+    "claim", "loan", "invest", "profit", "crypto", "bitcoin",
+    # Links and remote access
+    "http", "www.", "bit.ly", "click", "download",
+    "anydesk", "teamviewer", "quicksupport",
+    # Couriers and parcels
+    "parcel", "courier",
+)
+SCAM_FRAGMENTS = (
+    "₹", ".com", ".in/",
+    # UPI handles
+    "@ok", "@ybl", "@ibl", "@axl", "@upi", "@paytm",
+)
+
+# Keyword -> (must start a word, must end a word)
+_BOUNDARIES = {
+    **{fragment: (False, False) for fragment in SCAM_FRAGMENTS},
+    **{stem: (True, False) for stem in SCAM_STEMS},
+    **{word: (True, True) for word in SCAM_WORDS},
+}
+
+
+def _is_word_char(char: str) -> bool:
+    """Whether ``char`` counts as ``\\w`` for keyword boundaries."""
+    return char.isalnum() or char == "_"
+
+
+def _bounded(keyword: str, start: bool, end: bool) -> str:
+    """Regex for ``keyword`` with the given word boundaries."""
+    pattern = re.escape(keyword)
+    if start:
+        pattern = r"(?<!\w)" + pattern
+    if end:
+        pattern += r"(?!\w)"
+    return pattern
+
+
+def _build_automaton():
+    """Aho-Corasick automaton over all keywords, valued with their boundaries."""
+    automaton = ahocorasick.Automaton()
+    for keyword, (start, end) in _BOUNDARIES.items():
+        automaton.add_word(keyword, (len(keyword), start, end))
+    automaton.make_automaton()
+    return automaton
+
+
+def _build_pattern():
+    """One regex alternation over all keywords (used without pyahocorasick)."""
+    return re.compile("|".join(
+        _bounded(keyword, start, end) for keyword, (start, end) in _BOUNDARIES.items()
+    ))
+
+
+def _automaton_hit(automaton, text: str) -> bool:
+    """Whether an automaton match in ``text`` satisfies its word boundaries."""
+    for last, (length, start, end) in automaton.iter(text):
+        first = last - length + 1
+        if start and first > 0 and _is_word_char(text[first - 1]):
+            continue
+        if end and last + 1 < len(text) and _is_word_char(text[last + 1]):
+            continue
+        return True
+    return False
+
+
+_KEYWORD_AUTOMATON = _build_automaton() if ahocorasick is not None else None
+_KEYWORD_PATTERN = None if _KEYWORD_AUTOMATON is not None else _build_pattern()
+
+_stats = {"checked": 0, "hits": 0}
+
+
+def _has_keyword(text: str) -> bool:
+    """Whether the lowercased text contains any scam keyword."""
+    if _KEYWORD_AUTOMATON is not None:
+        return _automaton_hit(_KEYWORD_AUTOMATON, text)
+    return _KEYWORD_PATTERN.search(text) is not None
+
+
+def might_be_scam(*texts: str) -> bool:
+    """
+    Cheap check whether any of the texts could be part of a scam.
+    
+    Args:
+        *texts: Message texts (e.g. the latest message and earlier turns)
+    
+    Returns:
+        bool: False only if no text contains a scam keyword (always True
+        when the prefilter is disabled)
+    """
+    if not PREFILTER_ENABLED:
+        return True
+    
+    hit = any(_has_keyword(text.lower()) for text in texts)
+    
+    _stats["checked"] += 1
+    if hit:
+        _stats["hits"] += 1
+    return hit
+
+
+def prefilter_stats() -> Dict[str, float]:
+    """
+    Prefilter counters since startup.
+    
+    Returns:
+        Dict with 'checked', 'hits' and 'hit_rate' (hits / checked)
+    """
+    checked = _stats["checked"]
+    return {
+        "checked": checked,
+        "hits": _stats["hits"],
+        "hit_rate": round(_stats["hits"] / checked, 4) if checked else 0.0
+    }
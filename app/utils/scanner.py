@@ -0,0 +1,93 @@
+"""
+Multi-Pattern Scanner - Optional Hyperscan Acceleration
+
+Compiles a set of named regex patterns into a single Hyperscan database so
+one pass over a message reports which patterns match. Hyperscan is optional:
+when ``python-hyperscan`` is not installed (or a pattern is unsupported),
+``build_scanner`` returns None and callers use their pure-Python ``re`` path.
+A compile failure is logged as a warning naming the scanner, since it means
+Hyperscan is installed but not used.
+
+A database holds a single scratch space, so a scanner must not be shared
+across threads; the API scans on the event loop thread only.
+"""
+
+import re
+import logging
+from typing import Callable, Dict, Optional, Set, Tuple
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+logger = logging.getLogger(__name__)
+
+
+def build_scanner(
+    patterns: Dict[str, Tuple[str, int]],
+    prefilter: bool = False,
+    label: str = "patterns"
+) -> Optional[Callable[[str], Set[str]]]:
+    """
+    Compile named patterns into a Hyperscan database.
+    
+    Args:
+        patterns: Mapping of name -> (regex source, ``re`` flags)
+        prefilter: Compile in Hyperscan's prefilter mode, which accepts
+            constructs it cannot match exactly (e.g. ``\\b`` with Unicode
+            classes) and may report false positives but never misses a
+            match; callers must confirm with ``re``
+        label: What the scanner is for, used in log messages
+    
+    Returns:
+        A ``scan(text) -> set of matched names`` function, or None if
+        Hyperscan is unavailable or cannot compile the patterns
+    """
+    if hyperscan is None:
+        return None
+    
+    names = list(patterns)
+    expressions = []
+    flags = []
+    for pattern, re_flags in patterns.values():
+        expressions.append(pattern.encode("utf-8"))
+        # Existence only: report each pattern once, Unicode-aware like `re`
+        hs_flags = hyperscan.HS_FLAG_SINGLEMATCH | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP
+        if re_flags & re.IGNORECASE:
+            hs_flags |= hyperscan.HS_FLAG_CASELESS
+        if prefilter:
+            hs_flags |= hyperscan.HS_FLAG_PREFILTER
+        flags.append(hs_flags)
+    
+    database = hyperscan.Database()
+    try:
+        database.compile(
+            expressions=expressions,
+            ids=list(range(len(names))),
+            elements=len(names),
+            flags=flags
+        )
+    except hyperscan.error as e:
+        logger.warning(f"Hyperscan compile failed for {label}: {e} - Using re fallback")
+        return None
+    
+    def scan(text: str) -> Set[str]:
+        """Return the names of all patterns that match ``text``."""
+        matched: Set[str] = set()
+        
+        def on_match(pattern_id, start, end, match_flags, context):
+            matched.add(names[pattern_id])
+            # Returning True halts the scan once every pattern has matched
+            return len(matched) == len(names)
+        
+        try:
+            database.scan(text.encode("utf-8"), match_event_handler=on_match)
+        except hyperscan.error:
+            # Some bindings surface a halted scan as an error
+            if len(matched) != len(names):
+                raise
+        return matched
+    
+    logger.info(f"Hyperscan database compiled for {label} ({len(names)} patterns)")
+    return scan
@@ -0,0 +1,34 @@
+"""
+Gunicorn Configuration - Production Server
+
+Runs Uvicorn workers (one event loop each) so concurrent sessions scale
+across processes as well as within each loop. Every worker imports ``main``
+itself (no preload), so the AI components, their caches and connection
+pools are created per process after the fork.
+
+Usage:
+    gunicorn -c gunicorn.conf.py main:app
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# A small default: inside containers the CPU count is the host's, and each
+# worker holds its own caches (and embedding model, if enabled). Raise it
+# with WEB_CONCURRENCY where cores and memory allow.
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Reuse client connections across turns of a conversation
+keepalive = 30
+
+# LLM round-trips (with retries) can take a while; don't kill busy workers
+timeout = 120
+graceful_timeout = 30
+
+preload_app = False
+
+# No access log; the app writes one summary record per request
+accesslog = None
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
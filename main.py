@@ -12,29 +12,102 @@ Version: 2.0.0
 """
 
 from fastapi import FastAPI, HTTPException, Header, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Union, Any
+from typing import Optional, List, Dict, Union, Any, AsyncIterator
 import os
+import hmac
+import orjson
+import queue
+import atexit
+import asyncio
 import logging
+from logging.handlers import QueueHandler, QueueListener
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
+# Load environment variables (before app modules read their settings)
+load_dotenv()
+
 from app.brain1.sentinel import Sentinel
 from app.brain2.actor import Actor
 from app.utils.extraction import extract_intelligence
-from app.utils.callback import send_final_result
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+from app.utils.callback import (
+    dispatch_final_result,
+    start_retry_worker,
+    open_callback_client,
+    aclose_callback_client
 )
+from app.utils.llm_client import open_async_client, aclose_async_client
+from app.utils.prefilter import might_be_scam, prefilter_stats
+
+# Configure logging: handlers only enqueue records; a background thread
+# formats and writes them, keeping stderr I/O off the request path
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+
+def _configure_logging() -> None:
+    """
+    Route root logging through a queue drained by a listener thread.
+    
+    This module can be imported twice in one process (as ``__main__`` or
+    ``__mp_main__``, then as ``main`` by uvicorn), so the handlers are only
+    installed if no ``QueueHandler`` is present yet.
+    """
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    if any(isinstance(handler, QueueHandler) for handler in root.handlers):
+        return
+    
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    )
+    listener = QueueListener(log_queue, stream_handler)
+    root.addHandler(QueueHandler(log_queue))
+    listener.start()
+    atexit.register(listener.stop)
+
+
+_configure_logging()
+
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+# AI brains, built by ``lifespan`` in the process that serves requests
+sentinel: Optional[Sentinel] = None
+actor: Optional[Actor] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open shared resources on startup and release them on shutdown.
+    
+    The AI brains are built here rather than at import, so a module that
+    is imported more than once (e.g. by the reloader or worker processes)
+    does not load their models several times. The pooled LLM and callback
+    clients are bound to the server's event loop, and callbacks left
+    undelivered by previous runs are retried in the background. On shutdown
+    in-flight callbacks get a grace period before they are queued for retry.
+    """
+    global sentinel, actor
+    
+    logger.info("Initializing AI components...")
+    sentinel = Sentinel()
+    actor = Actor()
+    logger.info("AI components initialized successfully")
+    
+    app.state.llm_client = await open_async_client()
+    app.state.callback_client = await open_callback_client()
+    start_retry_worker()
+    yield
+    await aclose_callback_client()
+    await aclose_async_client()
+
 
 # Initialize FastAPI application
 app = FastAPI(
+    lifespan=lifespan,
     title="Agentic Honey-Pot API",
     description="AI-powered scam detection and autonomous engagement system",
     version="2.0.0",
@@ -45,6 +118,7 @@ app = FastAPI(
 # Security configuration
 API_KEY_NAME = "X-API-Key"
 API_KEY = os.getenv("API_KEY", "default_insecure_key_change_me")
+_API_KEY_BYTES = API_KEY.encode("utf-8")
 
 
 async def get_api_key(api_key: str = Header(..., alias=API_KEY_NAME)) -> str:
@@ -60,8 +134,9 @@ async def get_api_key(api_key: str = Header(..., alias=API_KEY_NAME)) -> str:
     Raises:
         HTTPException: 403 if API key is invalid
     """
-    if api_key != API_KEY:
-        logger.warning(f"Invalid API key attempt: {api_key[:10]}...")
+    # Constant-time comparison so response timing does not leak the key
+    if not hmac.compare_digest(api_key.encode("utf-8"), _API_KEY_BYTES):
+        logger.warning("Invalid API key attempt: %s...", api_key[:10])
         raise HTTPException(status_code=403, detail="Invalid API Key")
     return api_key
 
@@ -89,9 +164,11 @@ class ScamEventRequest(BaseModel):
     """Request payload for scam event analysis."""
     sessionId: str = Field(..., description="Unique session identifier")
     message: Message = Field(..., description="Current incoming message")
-    conversationHistory: List[Message] = Field(
-        default=[],
-        description="Previous messages in the conversation"
+    # Plain dicts: history is echoed back every turn, so re-validating each
+    # message would cost O(N) per request (O(N^2) per session)
+    conversationHistory: List[Dict[str, Any]] = Field(
+        default_factory=list,
+        description="Previous messages in the conversation (sender/text/timestamp)"
     )
     metadata: Optional[Metadata] = Field(None, description="Optional conversation metadata")
 
@@ -102,11 +179,87 @@ class AgentOutput(BaseModel):
     reply: Optional[str] = Field(None, description="Agent's response message")
 
 
-# Initialize AI brains
-logger.info("Initializing AI components...")
-sentinel = Sentinel()
-actor = Actor()
-logger.info("AI components initialized successfully")
+# Minimum Sentinel confidence before the Actor engages
+ENGAGE_CONFIDENCE = 0.65
+
+# Reply sent when the pipeline fails (keeps the persona in character)
+FALLBACK_REPLY = "Please explain again, I am not understanding this message."
+
+
+def _history_dicts(payload: ScamEventRequest) -> List[Dict[str, Any]]:
+    """
+    Read the fields the pipeline uses from the unvalidated history.
+    
+    Built in one pass whose result is shared by every pipeline stage.
+    
+    Args:
+        payload: Scam event request
+        
+    Returns:
+        List of dicts with 'sender', 'text' and 'timestamp'
+    """
+    return [
+        {
+            "sender": m.get("sender"),
+            "text": str(m.get("text") or ""),
+            "timestamp": m.get("timestamp")
+        }
+        for m in payload.conversationHistory
+    ]
+
+
+def _report_intelligence(
+    payload: ScamEventRequest,
+    history_dicts: List[Dict[str, Any]],
+    total_messages: int
+) -> Dict[str, Any]:
+    """
+    Extract intelligence from the whole conversation and send the callback.
+    
+    Args:
+        payload: Scam event request
+        history_dicts: History built by ``_history_dicts``
+        total_messages: Number of messages including the current one
+        
+    Returns:
+        Dict: Extracted intelligence (cumulative over the conversation)
+    """
+    # Aggregate text from full history to capture all context
+    full_context = " ".join([m["text"] for m in history_dicts])
+    full_context += " " + payload.message.text
+    
+    extracted = extract_intelligence(full_context)
+    
+    # Send mandatory callback to evaluation endpoint (in the background)
+    dispatch_final_result(
+        session_id=payload.sessionId,
+        scam_detected=True,
+        total_messages=total_messages,
+        intelligence=extracted
+    )
+    return extracted
+
+
+def _log_summary(
+    session_id: str,
+    analysis: Dict[str, Any],
+    engaged: bool,
+    extracted: Dict[str, Any]
+) -> None:
+    """Log the one summary record written per request."""
+    logger.info(
+        "Session %s - Scam: %s, Confidence: %s, Engaged: %s, "
+        "Extracted (cumulative): %d UPIs, %d accounts, %d phones",
+        session_id, analysis["is_scam"], analysis["confidence"], engaged,
+        len(extracted.get("upi_ids", [])),
+        len(extracted.get("bank_accounts", [])),
+        len(extracted.get("phone_numbers", []))
+    )
+
+
+def _sse(event: str, data: Dict[str, Any]) -> bytes:
+    """Encode one Server-Sent Event with a JSON payload."""
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + orjson.dumps(data) + b"\n\n"
 
 
 @app.post("/scam-event", response_model=AgentOutput)
@@ -117,9 +270,12 @@ async def handle_scam_event(
     """
     Process incoming message for scam detection and autonomous engagement.
     
-    This endpoint implements a three-stage pipeline:
+    Messages in conversations without any scam keyword are answered
+    immediately without a reply. Otherwise this endpoint implements a
+    three-stage pipeline:
     1. Brain-1 (Sentinel): Detects scam intent using hybrid detection
-    2. Brain-2 (Actor): Engages scammer if detected
+    2. Brain-2 (Actor): Engages scammer if detected (drafted concurrently
+       with stage 1 and cancelled for legitimate messages)
     3. Intelligence Extraction: Extracts and reports scam intelligence
     
     Args:
@@ -133,55 +289,49 @@ async def handle_scam_event(
         HTTPException: 500 if processing fails
     """
     try:
-        logger.info(f"Processing scam event for session: {payload.sessionId}")
+        logger.debug("Processing scam event for session: %s", payload.sessionId)
+        
+        history_dicts = _history_dicts(payload)
+        total_messages = len(history_dicts) + 1
+        
+        # Stage 0: Skip the LLM pipeline when nothing in the conversation
+        # uses scam vocabulary
+        if not might_be_scam(
+            payload.message.text,
+            *(m["text"] for m in history_dicts)
+        ):
+            logger.info("Session %s - No scam keywords, skipping analysis", payload.sessionId)
+            return AgentOutput(status="success", reply=None)
+        
+        # Brain-2 drafts its reply speculatively while Brain-1 decides; the
+        # draft is cancelled if the message turns out not to be a scam
+        actor_task = asyncio.create_task(
+            actor.engage_async(payload.message.text, history_dicts)
+        )
         
         # Stage 1: Scam Detection (Brain-1: Sentinel)
-        analysis = sentinel.analyze(payload.message.text)
+        try:
+            analysis = await sentinel.analyze_async(payload.message.text, history=history_dicts)
+        except Exception:
+            actor_task.cancel()
+            raise
         is_scam = analysis["is_scam"]
         confidence = analysis["confidence"]
         
-        logger.info(
-            f"Session {payload.sessionId} - "
-            f"Scam detected: {is_scam}, Confidence: {confidence}"
-        )
-        
         agent_reply = None
         extracted = {}
         
         # Stage 2: Agent Engagement (Brain-2: Actor)
-        if is_scam and confidence >= 0.65:
-            logger.info(f"Session {payload.sessionId} - Activating engagement agent")
-            
-            # Convert history to dictionary format
-            history_dicts = [m.model_dump() for m in payload.conversationHistory]
-            
-            # Generate contextual response
-            agent_reply = actor.engage(payload.message.text, history_dicts)
-            logger.info(f"Session {payload.sessionId} - Agent generated response")
+        if is_scam and confidence >= ENGAGE_CONFIDENCE:
+            # Collect the contextual response started alongside detection
+            agent_reply = await actor_task
             
             # Stage 3: Intelligence Extraction & Callback
-            # Aggregate text from full history to capture all context
-            full_context = " ".join([m.text for m in payload.conversationHistory])
-            full_context += " " + payload.message.text
-            
-            extracted = extract_intelligence(full_context)
-            
-            logger.info(
-                f"Session {payload.sessionId} - "
-                f"Extracted intelligence (cumulative): {len(extracted.get('upi_ids', []))} UPIs, "
-                f"{len(extracted.get('bank_accounts', []))} accounts, "
-                f"{len(extracted.get('phone_numbers', []))} phones"
-            )
-            
-            # Send mandatory callback to evaluation endpoint
-            total_messages = len(payload.conversationHistory) + 1
-            send_final_result(
-                session_id=payload.sessionId,
-                scam_detected=True,
-                total_messages=total_messages,
-                intelligence=extracted
-            )
-            logger.info(f"Session {payload.sessionId} - Callback sent successfully")
+            extracted = _report_intelligence(payload, history_dicts, total_messages)
+        else:
+            actor_task.cancel()
+        
+        _log_summary(payload.sessionId, analysis, agent_reply is not None, extracted)
         
         return AgentOutput(
             status="success",
@@ -189,16 +339,88 @@ async def handle_scam_event(
         )
         
     except Exception as e:
-        logger.error(
-            f"Error processing session {payload.sessionId}: {str(e)}",
-            exc_info=True
-        )
+        logger.error("Error processing session %s: %s", payload.sessionId, e, exc_info=True)
         return AgentOutput(
             status="success",
-            reply="Please explain again, I am not understanding this message."
+            reply=FALLBACK_REPLY
         )
 
 
+@app.post("/scam-event/stream")
+async def handle_scam_event_stream(
+    payload: ScamEventRequest,
+    api_key: str = Depends(get_api_key)
+) -> StreamingResponse:
+    """
+    Streaming variant of ``/scam-event`` using Server-Sent Events.
+    
+    Runs the same pipeline, but the Actor's reply is sent as it is
+    generated, so the client sees the first words after the LLM's first
+    token instead of its last. Events:
+    - ``reply``: ``{"delta": "..."}`` for each piece of the reply
+    - ``done``: ``{"status": "success", "reply": <full reply or null>}``
+    
+    Args:
+        payload: Scam event request containing message and history
+        api_key: Validated API key from dependency injection
+        
+    Returns:
+        StreamingResponse: ``text/event-stream`` of the events above
+    """
+    return StreamingResponse(
+        _stream_scam_event(payload),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+async def _stream_scam_event(payload: ScamEventRequest) -> AsyncIterator[bytes]:
+    """
+    Event generator behind ``/scam-event/stream``.
+    
+    Errors cannot change the status once streaming has started, so they end
+    the stream with the fallback reply (or whatever was already sent).
+    
+    Args:
+        payload: Scam event request
+        
+    Yields:
+        bytes: Encoded SSE events
+    """
+    pieces: List[str] = []
+    agent_reply = None
+    
+    try:
+        history_dicts = _history_dicts(payload)
+        total_messages = len(history_dicts) + 1
+        
+        if might_be_scam(
+            payload.message.text,
+            *(m["text"] for m in history_dicts)
+        ):
+            analysis = await sentinel.analyze_async(payload.message.text, history=history_dicts)
+            engaged = analysis["is_scam"] and analysis["confidence"] >= ENGAGE_CONFIDENCE
+            extracted = {}
+            
+            if engaged:
+                async for delta in actor.engage_stream(payload.message.text, history_dicts):
+                    pieces.append(delta)
+                    yield _sse("reply", {"delta": delta})
+                agent_reply = "".join(pieces)
+                
+                extracted = _report_intelligence(payload, history_dicts, total_messages)
+            
+            _log_summary(payload.sessionId, analysis, engaged, extracted)
+        else:
+            logger.info("Session %s - No scam keywords, skipping analysis", payload.sessionId)
+    
+    except Exception as e:
+        logger.error("Error streaming session %s: %s", payload.sessionId, e, exc_info=True)
+        agent_reply = "".join(pieces) or FALLBACK_REPLY
+    
+    yield _sse("done", {"status": "success", "reply": agent_reply})
+
+
 @app.get("/health")
 async def health_check() -> Dict[str, str]:
     """
@@ -210,13 +432,29 @@ async def health_check() -> Dict[str, str]:
     return {"status": "healthy", "service": "agentic-honeypot"}
 
 
+@app.get("/stats")
+async def stats(api_key: str = Depends(get_api_key)) -> Dict[str, Any]:
+    """
+    Runtime counters for tuning (e.g. keyword prefilter hit rate).
+    
+    Returns:
+        Dict: Counters by component
+    """
+    return {"prefilter": prefilter_stats()}
+
+
 if __name__ == "__main__":
     import uvicorn
     
     logger.info("Starting Agentic Honey-Pot API server...")
     uvicorn.run(
-        app,
+        "main:app",  # import string, required for multiple workers
         host="127.0.0.1",
         port=8001,
+        # Each worker loads its own models; production sizing is in gunicorn.conf.py
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        loop="auto",  # uvloop when installed (not available on Windows)
+        http="auto",  # httptools when installed
+        access_log=False,
         log_level="info"
     )
@@ -1,4 +1,5 @@
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import uuid
 import datetime
@@ -19,6 +20,11 @@ class MockScammer:
             "Last warning. Police case will be filed."
         ]
         self.current_turn = 0
+        
+        # Keep-alive connection reused across turns
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        self.session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
 
     def send_next_message(self):
         if self.current_turn >= len(self.turns):
@@ -46,7 +52,7 @@ class MockScammer:
 
         print(f"\n[Mock Scammer] Sending: {message_text}")
         try:
-            response = requests.post(API_URL, json=payload, headers=HEADERS)
+            response = self.session.post(API_URL, json=payload)
             if response.status_code == 200:
                 data = response.json()
                 print(f"[System Response] Status: {data.get('status')}")
@@ -0,0 +1,159 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.brain2.actor import Actor
+from app.utils import llm_client
+
+
+@pytest.fixture
+def actor(monkeypatch):
+    monkeypatch.delenv("ACTOR_SEMANTIC_CACHE", raising=False)
+    return Actor()
+
+
+def _fake_stream(monkeypatch, *deltas, error=None):
+    async def stream(prompt, system_prompt=None, model=None, history=None):
+        for delta in deltas:
+            yield delta
+        if error is not None:
+            raise error
+    
+    monkeypatch.setattr(llm_client, "stream_openrouter", stream)
+
+
+def _collect(actor, message="Share your UPI PIN", history=()):
+    async def main():
+        return [piece async for piece in actor.engage_stream(message, list(history))]
+    
+    return asyncio.run(main())
+
+
+def test_stream_caches_completed_reply(actor, monkeypatch):
+    _fake_stream(monkeypatch, "What is this ", "UPI PIN sir?")
+    
+    assert "".join(_collect(actor)) == "What is this UPI PIN sir?"
+    assert actor._cached_reply("Share your UPI PIN", []) == "What is this UPI PIN sir?"
+
+
+def test_interrupted_stream_is_not_cached(actor, monkeypatch):
+    _fake_stream(
+        monkeypatch, "Sir which bank ", "are you calling",
+        error=httpx.ReadError("connection reset")
+    )
+    
+    assert "".join(_collect(actor)) == "Sir which bank are you calling"
+    assert actor._cached_reply("Share your UPI PIN", []) is None
+
+
+@pytest.mark.parametrize("deltas, reply", [
+    (["AgentX: Sir, ", "what is this OTP?"], "Sir, what is this OTP?"),
+    (['"ASSISTANT: AgentX:', " I am not understanding", '"'], "I am not understanding"),
+    (["Sir what is ", '"UPI', '" exactly? ', ' "'], 'Sir what is "UPI" exactly?'),
+    (['"Okay sir"'], "Okay sir"),
+])
+def test_stream_strips_labels_and_quotes(actor, monkeypatch, deltas, reply):
+    _fake_stream(monkeypatch, *deltas)
+    
+    pieces = _collect(actor)
+    assert "".join(pieces) == reply
+    assert actor._cached_reply("Share your UPI PIN", []) == reply
+
+
+def test_stream_failure_before_output_yields_fallback(actor, monkeypatch):
+    _fake_stream(monkeypatch, "AgentX:", error=httpx.ReadError("connection reset"))
+    
+    pieces = _collect(actor)
+    assert len(pieces) == 1 and pieces[0]
+    assert actor._cached_reply("Share your UPI PIN", []) is None
+
+
+def test_stream_serves_cached_reply(actor, monkeypatch):
+    actor._replies.set(actor._reply_key("Share your UPI PIN", []), "Cached reply")
+    _fake_stream(monkeypatch, error=AssertionError("LLM must not be called"))
+    
+    assert _collect(actor) == ["Cached reply"]
+
+
+def _turns(count):
+    return [
+        {"sender": "scammer" if i % 2 == 0 else "user", "text": f"turn {i}"}
+        for i in range(count)
+    ]
+
+
+def _fake_summarizer(monkeypatch, reply="Scammer wants the OTP."):
+    prompts = []
+    
+    async def call(prompt, system_prompt=None, model=None, history=None):
+        prompts.append(prompt)
+        return reply
+    
+    monkeypatch.setattr(llm_client, "acall_openrouter", call)
+    return prompts
+
+
+async def _settle(actor):
+    while actor._summary_tasks:
+        await asyncio.gather(*actor._summary_tasks)
+
+
+def test_short_history_is_sent_verbatim_as_chat_turns(actor):
+    history = _turns(Actor.HISTORY_WINDOW + Actor.SUMMARY_INTERVAL - 1)
+    
+    messages = actor._build_chat_history(history)
+    assert [m["content"] for m in messages] == [t["text"] for t in history]
+    assert messages[0]["role"] == "user" and messages[1]["role"] == "assistant"
+
+
+def test_long_history_is_summarized_once_available(actor, monkeypatch):
+    prompts = _fake_summarizer(monkeypatch)
+    history = _turns(Actor.HISTORY_WINDOW + Actor.SUMMARY_INTERVAL)
+    
+    async def main():
+        # No summary yet: a refresh starts and the full history is sent
+        first = actor._build_chat_history(history)
+        await _settle(actor)
+        return first, actor._build_chat_history(history)
+    
+    first, second = asyncio.run(main())
+    assert len(first) == len(history)
+    assert second[0] == {"role": "system", "content": "Earlier summary: Scammer wants the OTP."}
+    assert [m["content"] for m in second[1:]] == [t["text"] for t in history[Actor.SUMMARY_INTERVAL:]]
+    assert len(prompts) == 1 and "turn 0" in prompts[0]
+
+
+def test_previous_summary_is_used_while_refreshing(actor, monkeypatch):
+    prompts = _fake_summarizer(monkeypatch)
+    interval = Actor.SUMMARY_INTERVAL
+    history = _turns(Actor.HISTORY_WINDOW + 2 * interval)
+    
+    async def main():
+        actor._build_chat_history(history[:Actor.HISTORY_WINDOW + interval])
+        await _settle(actor)
+        
+        # The next refresh builds on the first summary; until it lands the
+        # first summary covers the older turns
+        pending = actor._build_chat_history(history)
+        await _settle(actor)
+        return pending
+    
+    pending = asyncio.run(main())
+    assert pending[0]["role"] == "system"
+    assert [m["content"] for m in pending[1:]] == [t["text"] for t in history[interval:]]
+    assert prompts[1].startswith("Summary so far: Scammer wants the OTP.")
+    assert "turn 0" not in prompts[1] and f"turn {interval}" in prompts[1]
+
+
+def test_fallback_text_is_not_cached_as_summary(actor, monkeypatch):
+    _fake_summarizer(monkeypatch, reply=llm_client.FALLBACK_RESPONSES[0])
+    history = _turns(Actor.HISTORY_WINDOW + Actor.SUMMARY_INTERVAL)
+    
+    async def main():
+        actor._build_chat_history(history)
+        await _settle(actor)
+        return actor._build_chat_history(history)
+    
+    assert len(asyncio.run(main())) == len(history)
+    assert actor._summaries.get(actor._summary_key(history[:Actor.SUMMARY_INTERVAL])) is None
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from app.utils.batcher import BatchScheduler
+
+
+def _recording_handler(batches):
+    async def handler(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+    return handler
+
+
+def test_flushes_when_batch_is_full():
+    batches = []
+    
+    async def main():
+        # A long wait proves the flush came from the size limit
+        scheduler = BatchScheduler(_recording_handler(batches), batch_size=3, max_wait_ms=10_000)
+        return await asyncio.wait_for(
+            asyncio.gather(*(scheduler.submit(i) for i in range(3))), 1
+        )
+    
+    assert asyncio.run(main()) == [0, 10, 20]
+    assert batches == [[0, 1, 2]]
+
+
+def test_flushes_partial_batch_after_max_wait():
+    batches = []
+    
+    async def main():
+        scheduler = BatchScheduler(_recording_handler(batches), batch_size=8, max_wait_ms=20)
+        return await asyncio.wait_for(
+            asyncio.gather(scheduler.submit(1), scheduler.submit(2)), 1
+        )
+    
+    assert asyncio.run(main()) == [10, 20]
+    assert batches == [[1, 2]]
+
+
+def test_splits_overflow_into_next_batch():
+    batches = []
+    
+    async def main():
+        scheduler = BatchScheduler(_recording_handler(batches), batch_size=2, max_wait_ms=20)
+        return await asyncio.gather(*(scheduler.submit(i) for i in range(5)))
+    
+    assert asyncio.run(main()) == [0, 10, 20, 30, 40]
+    assert batches == [[0, 1], [2, 3], [4]]
+
+
+def test_failed_batch_fails_every_waiter():
+    async def handler(items):
+        raise RuntimeError("LLM down")
+    
+    async def main():
+        scheduler = BatchScheduler(handler, batch_size=3, max_wait_ms=20)
+        return await asyncio.gather(
+            *(scheduler.submit(i) for i in range(3)), return_exceptions=True
+        )
+    
+    results = asyncio.run(main())
+    assert len(results) == 3
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_short_result_list_fails_missing_items():
+    async def handler(items):
+        return ["only one"]
+    
+    async def main():
+        scheduler = BatchScheduler(handler, batch_size=2, max_wait_ms=20)
+        return await asyncio.gather(
+            scheduler.submit("a"), scheduler.submit("b"), return_exceptions=True
+        )
+    
+    first, second = asyncio.run(main())
+    assert first == "only one"
+    assert isinstance(second, RuntimeError)
+
+
+def test_cancelled_waiter_does_not_affect_batch():
+    async def handler(items):
+        await asyncio.sleep(0.02)
+        return [item.upper() for item in items]
+    
+    async def main():
+        scheduler = BatchScheduler(handler, batch_size=2, max_wait_ms=10_000)
+        first = asyncio.ensure_future(scheduler.submit("a"))
+        second = asyncio.ensure_future(scheduler.submit("b"))
+        await asyncio.sleep(0.01)
+        
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+    
+    assert asyncio.run(main()) == "B"
+
+
+def test_rebinds_to_a_new_event_loop():
+    batches = []
+    scheduler = BatchScheduler(_recording_handler(batches), batch_size=1, max_wait_ms=20)
+    
+    assert asyncio.run(scheduler.submit(1)) == 10
+    assert asyncio.run(scheduler.submit(2)) == 20
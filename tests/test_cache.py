@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from app.utils.cache import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    calls = 0
+    
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "reply"
+    
+    async def main():
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.run(b"k", compute) for _ in range(5)))
+        return flights, results
+    
+    flights, results = asyncio.run(main())
+    assert results == ["reply"] * 5
+    assert calls == 1
+    assert not flights._flights
+
+
+def test_failure_reaches_every_caller():
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise ValueError("LLM down")
+    
+    async def main():
+        flights = SingleFlight()
+        return await asyncio.gather(
+            *(flights.run(b"k", compute) for _ in range(3)), return_exceptions=True
+        )
+    
+    results = asyncio.run(main())
+    assert len(results) == 3
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_cancelled_caller_does_not_cancel_others():
+    started = 0
+    
+    async def compute():
+        nonlocal started
+        started += 1
+        await asyncio.sleep(0.05)
+        return "reply"
+    
+    async def main():
+        flights = SingleFlight()
+        first = asyncio.ensure_future(flights.run(b"k", compute))
+        second = asyncio.ensure_future(flights.run(b"k", compute))
+        await asyncio.sleep(0.01)
+        
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+    
+    assert asyncio.run(main()) == "reply"
+    assert started == 1
+
+
+def test_last_cancelled_caller_cancels_computation():
+    async def main():
+        stopped = asyncio.Event()
+        
+        async def compute():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                stopped.set()
+                raise
+        
+        flights = SingleFlight()
+        caller = asyncio.ensure_future(flights.run(b"k", compute))
+        await asyncio.sleep(0.01)
+        
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.wait_for(stopped.wait(), 1)
+        
+        # The key is free again, so the next call starts fresh
+        async def again():
+            return "fresh"
+        return await flights.run(b"k", again)
+    
+    assert asyncio.run(main()) == "fresh"
@@ -0,0 +1,200 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+import orjson
+import pytest
+
+from app.utils import callback
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    path = str(tmp_path / "callback_queue.jsonl")
+    monkeypatch.setattr(callback, "CALLBACK_QUEUE_PATH", path)
+    monkeypatch.setattr(callback, "CALLBACK_DEAD_LETTER_PATH", f"{path}.dead")
+    return path
+
+
+def _write(path, entries):
+    with open(path, "wb") as queue_file:
+        for entry in entries:
+            queue_file.write(orjson.dumps(entry) + b"\n")
+
+
+def _read(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as queue_file:
+        return [orjson.loads(line) for line in queue_file]
+
+
+def _outcomes(monkeypatch, outcomes):
+    sent = []
+    
+    def post(payload):
+        sent.append(payload["sessionId"])
+        return outcomes[payload["sessionId"]]
+    
+    monkeypatch.setattr(callback, "_post", post)
+    return sent
+
+
+def _dead_pid():
+    child = subprocess.Popen([sys.executable, "-c", "pass"])
+    child.wait()
+    return child.pid
+
+
+def test_drain_sorts_entries_by_outcome(queue, monkeypatch):
+    _write(queue, [
+        callback._queue_entry({"sessionId": "ok"}),
+        callback._queue_entry({"sessionId": "later"}, attempts=2),
+        callback._queue_entry({"sessionId": "bad"}),
+    ])
+    _outcomes(monkeypatch, {"ok": callback.DELIVERED, "later": callback.RETRY, "bad": callback.REJECTED})
+    
+    assert callback.drain_retry_queue() == 1
+    assert _read(queue) == [{"attempts": 3, "payload": {"sessionId": "later"}}]
+    assert _read(f"{queue}.dead") == [{"attempts": 1, "payload": {"sessionId": "bad"}}]
+    assert not os.path.exists(callback._claim_path(os.getpid()))
+
+
+def test_drain_dead_letters_after_max_attempts(queue, monkeypatch):
+    attempts = callback.CALLBACK_MAX_QUEUE_ATTEMPTS - 1
+    _write(queue, [callback._queue_entry({"sessionId": "s"}, attempts=attempts)])
+    _outcomes(monkeypatch, {"s": callback.RETRY})
+    
+    assert callback.drain_retry_queue() == 0
+    assert _read(queue) == []
+    assert _read(f"{queue}.dead")[0]["attempts"] == callback.CALLBACK_MAX_QUEUE_ATTEMPTS
+
+
+def test_drain_reads_legacy_payloads(queue, monkeypatch):
+    _write(queue, [{"sessionId": "old"}])
+    with open(queue, "ab") as queue_file:
+        queue_file.write(b"not json\n")
+    _outcomes(monkeypatch, {"old": callback.RETRY})
+    
+    callback.drain_retry_queue()
+    assert _read(queue) == [{"attempts": 1, "payload": {"sessionId": "old"}}]
+
+
+def test_drain_recovers_claims_of_dead_processes(queue, monkeypatch):
+    stale = callback._claim_path(_dead_pid())
+    _write(stale, [callback._queue_entry({"sessionId": "orphan"})])
+    _write(queue, [callback._queue_entry({"sessionId": "fresh"})])
+    sent = _outcomes(monkeypatch, {"orphan": callback.DELIVERED, "fresh": callback.DELIVERED})
+    
+    assert callback.drain_retry_queue() == 2
+    assert sorted(sent) == ["fresh", "orphan"]
+    assert not os.path.exists(stale)
+
+
+def test_drain_leaves_claims_of_live_processes(queue, monkeypatch):
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        live = callback._claim_path(child.pid)
+        _write(live, [callback._queue_entry({"sessionId": "theirs"})])
+        sent = _outcomes(monkeypatch, {})
+        
+        assert callback.drain_retry_queue() == 0
+        assert sent == []
+        assert os.path.exists(live)
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_drain_keeps_claim_when_post_raises(queue, monkeypatch):
+    _write(queue, [callback._queue_entry({"sessionId": "s"})])
+    
+    def post(payload):
+        raise OSError("disk full")
+    
+    monkeypatch.setattr(callback, "_post", post)
+    with pytest.raises(OSError):
+        callback.drain_retry_queue()
+    
+    # The next drain finishes our own leftover claim
+    claim = callback._claim_path(os.getpid())
+    assert _read(claim) == [{"attempts": 0, "payload": {"sessionId": "s"}}]
+    _outcomes(monkeypatch, {"s": callback.DELIVERED})
+    assert callback.drain_retry_queue() == 1
+    assert not os.path.exists(claim)
+
+
+def _send(monkeypatch, statuses):
+    """Run send_final_result against a mock GUVI endpoint answering ``statuses``."""
+    responses = iter(statuses)
+    requests = []
+    
+    def handler(request):
+        requests.append(orjson.loads(request.content))
+        return httpx.Response(next(responses))
+    
+    monkeypatch.setattr(callback, "CALLBACK_BACKOFF_FACTOR", 0)
+    monkeypatch.setattr(callback, "start_retry_worker", lambda: None)
+    
+    async def main():
+        callback._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        callback._async_loop = asyncio.get_running_loop()
+        try:
+            return await callback.send_final_result("s1", True, 3, {"upi_ids": ["a@ybl"]})
+        finally:
+            await callback.aclose_callback_client()
+    
+    return asyncio.run(main()), requests
+
+
+def test_send_delivers_on_200(queue, monkeypatch):
+    delivered, requests = _send(monkeypatch, [200])
+    
+    assert delivered
+    assert requests[0]["extractedIntelligence"]["upiIds"] == ["a@ybl"]
+    assert _read(queue) == []
+
+
+def test_send_retries_then_queues_transient_failures(queue, monkeypatch):
+    statuses = [503] * (callback.CALLBACK_MAX_RETRIES + 1)
+    delivered, requests = _send(monkeypatch, statuses)
+    
+    assert not delivered
+    assert len(requests) == callback.CALLBACK_MAX_RETRIES + 1
+    assert [entry["payload"]["sessionId"] for entry in _read(queue)] == ["s1"]
+
+
+def test_send_does_not_queue_rejected_payloads(queue, monkeypatch):
+    delivered, requests = _send(monkeypatch, [404])
+    
+    assert not delivered
+    assert len(requests) == 1
+    assert _read(queue) == []
+
+
+def test_rebinding_closes_client_of_running_loop():
+    old_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=old_loop.run_forever, daemon=True)
+    thread.start()
+    old_client = httpx.AsyncClient()
+    try:
+        callback._async_client, callback._async_loop = old_client, old_loop
+        
+        async def main():
+            client = await callback.open_callback_client()
+            await callback.aclose_callback_client()
+            return client
+        
+        assert asyncio.run(main()) is not old_client
+        deadline = time.monotonic() + 1
+        while not old_client.is_closed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert old_client.is_closed
+    finally:
+        old_loop.call_soon_threadsafe(old_loop.stop)
+        thread.join()
+        old_loop.close()
@@ -0,0 +1,30 @@
+import re
+import unicodedata
+
+import pytest
+
+from app.utils.extraction import UPI_PATTERN, URL_PATTERN, extract_intelligence
+
+
+def test_extracts_non_ascii_upi_ids():
+    intel = extract_intelligence("Send to émile@oksbi or naïve@bänk.in now")
+    assert intel["upi_ids"] == ["émile@oksbi", "naïve@bänk.in"]
+
+
+def test_extracts_non_ascii_urls():
+    intel = extract_intelligence("Verify at https://bänk-kyc.in now")
+    assert intel["phishing_urls"] == ["https://bänk-kyc.in"]
+
+
+@pytest.mark.parametrize("pattern", [UPI_PATTERN, URL_PATTERN], ids=["upi", "url"])
+def test_re2_sources_match_stdlib(pattern):
+    re2 = pytest.importorskip("re2")
+    stdlib, linear = re.compile(pattern[0]), re2.compile(pattern[1])
+    
+    # Every code point both engines know (RE2 may ship a newer Unicode)
+    for cp in range(0x110000):
+        char = chr(cp)
+        if 0xD800 <= cp <= 0xDFFF or unicodedata.category(char) == "Cn":
+            continue
+        text = f"pay a{char}b@c{char}d via http://x{char}y.in/%4{char} ok"
+        assert linear.findall(text) == stdlib.findall(text), hex(cp)
@@ -0,0 +1,114 @@
+import asyncio
+
+import httpx
+import orjson
+import pytest
+
+from app.utils import llm_client
+
+
+@pytest.fixture(autouse=True)
+def environment(monkeypatch):
+    monkeypatch.setenv("LLM_API_KEY", "gsk_test")
+    monkeypatch.delenv("LLM_BASE_URL", raising=False)
+    monkeypatch.setattr(llm_client, "_retry_delay", lambda attempt, retry_after=None: 0)
+
+
+class _BrokenStream(httpx.AsyncByteStream):
+    """Response body that sends ``chunks`` and then loses the connection."""
+    
+    def __init__(self, chunks):
+        self.chunks = chunks
+    
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+        raise httpx.ReadError("connection reset")
+
+
+def _event(content=None, finish_reason=None):
+    delta = {} if content is None else {"content": content}
+    choice = {"delta": delta, "finish_reason": finish_reason}
+    return b"data: " + orjson.dumps({"choices": [choice]}) + b"\n\n"
+
+
+def _stream(handler):
+    async def main():
+        llm_client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        llm_client._async_semaphore = asyncio.Semaphore(1)
+        llm_client._async_loop = asyncio.get_running_loop()
+        deltas = []
+        try:
+            async for delta in llm_client.stream_openrouter("hello"):
+                deltas.append(delta)
+        except Exception as e:
+            return deltas, e
+        finally:
+            await llm_client.aclose_async_client()
+        return deltas, None
+    
+    return asyncio.run(main())
+
+
+def test_stream_yields_content_deltas():
+    body = (
+        b": keep-alive\n\n"
+        + _event()  # role-only first chunk
+        + _event("Sir, ")
+        + _event("which bank?")
+        + _event(finish_reason="stop")
+        + b"data: [DONE]\n\n"
+    )
+    requests = []
+    
+    def handler(request):
+        requests.append(orjson.loads(request.content))
+        return httpx.Response(200, content=body)
+    
+    deltas, error = _stream(handler)
+    assert (deltas, error) == (["Sir, ", "which bank?"], None)
+    assert requests[0]["stream"] is True
+
+
+def test_stream_completes_on_finish_reason_without_done():
+    def handler(request):
+        return httpx.Response(200, content=_event("Okay sir", finish_reason="stop"))
+    
+    assert _stream(handler) == (["Okay sir"], None)
+
+
+def test_stream_interrupted_after_content_raises():
+    def handler(request):
+        return httpx.Response(200, stream=_BrokenStream([_event("Sir which bank are you calling")]))
+    
+    deltas, error = _stream(handler)
+    assert deltas == ["Sir which bank are you calling"]
+    assert isinstance(error, httpx.ReadError)
+
+
+def test_stream_ending_without_completion_raises():
+    def handler(request):
+        return httpx.Response(200, content=_event("Sir which bank"))
+    
+    deltas, error = _stream(handler)
+    assert deltas == ["Sir which bank"]
+    assert isinstance(error, httpx.RemoteProtocolError)
+
+
+def test_stream_failure_before_content_yields_fallback():
+    def handler(request):
+        return httpx.Response(400, json={"error": "bad request"})
+    
+    deltas, error = _stream(handler)
+    assert error is None
+    assert len(deltas) == 1 and deltas[0] in llm_client.FALLBACK_RESPONSES
+
+
+def test_stream_retries_when_cut_off_before_content():
+    responses = iter([
+        httpx.Response(200, stream=_BrokenStream([])),
+        httpx.Response(200, content=_event("Hello ji", finish_reason="stop")),
+    ])
+    
+    deltas, error = _stream(lambda request: next(responses))
+    assert (deltas, error) == (["Hello ji"], None)
@@ -0,0 +1,177 @@
+import asyncio
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+SCAM_TEXT = "Your account is blocked, share the OTP now"
+
+
+class FakeSentinel:
+    def __init__(self, verdict=None, error=None):
+        self.verdict = verdict
+        self.error = error
+        self.calls = 0
+    
+    async def analyze_async(self, message, history=None):
+        self.calls += 1
+        await asyncio.sleep(0)  # the speculative draft starts meanwhile
+        if self.error is not None:
+            raise self.error
+        return self.verdict
+
+
+class FakeActor:
+    def __init__(self, pieces=("Which ", "bank sir?"), error=None):
+        self.pieces = pieces
+        self.error = error
+        self.started = False
+        self.cancelled = False
+    
+    async def engage_async(self, message, history):
+        self.started = True
+        try:
+            await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return "".join(self.pieces)
+    
+    async def engage_stream(self, message, history):
+        for piece in self.pieces:
+            yield piece
+        if self.error is not None:
+            raise self.error
+
+
+SCAM = {"is_scam": True, "confidence": 0.9, "reason": "otp", "signals": {}}
+SAFE = {"is_scam": False, "confidence": 0.1, "reason": "benign", "signals": {}}
+
+
+@pytest.fixture
+def reports(monkeypatch):
+    sent = []
+    monkeypatch.setattr(main, "dispatch_final_result", lambda **kwargs: sent.append(kwargs))
+    monkeypatch.setattr(main, "might_be_scam", lambda *texts: "OTP" in " ".join(texts))
+    return sent
+
+
+def _install(monkeypatch, sentinel, actor):
+    monkeypatch.setattr(main, "sentinel", sentinel)
+    monkeypatch.setattr(main, "actor", actor)
+
+
+def _request(text=SCAM_TEXT, history=()):
+    return main.ScamEventRequest(
+        sessionId="s1",
+        message={"sender": "scammer", "text": text, "timestamp": 1},
+        conversationHistory=list(history)
+    )
+
+
+def _handle(payload):
+    async def run():
+        response = await main.handle_scam_event(payload, api_key=main.API_KEY)
+        await asyncio.sleep(0.02)  # let a cancelled draft unwind
+        return response
+    
+    return asyncio.run(run())
+
+
+def test_scam_event_engages_and_reports(monkeypatch, reports):
+    actor = FakeActor()
+    _install(monkeypatch, FakeSentinel(SCAM), actor)
+    
+    history = [{"sender": "scammer", "text": "Hello sir", "timestamp": 0}]
+    response = _handle(_request(history=history))
+    assert response.reply == "Which bank sir?"
+    assert len(reports) == 1 and reports[0]["total_messages"] == 2
+
+
+def test_scam_event_cancels_draft_for_safe_message(monkeypatch, reports):
+    actor = FakeActor()
+    _install(monkeypatch, FakeSentinel(SAFE), actor)
+    
+    response = _handle(_request())
+    assert response.reply is None
+    assert actor.started and actor.cancelled
+    assert reports == []
+
+
+def test_scam_event_cancels_draft_when_detection_fails(monkeypatch, reports):
+    actor = FakeActor()
+    _install(monkeypatch, FakeSentinel(error=RuntimeError("boom")), actor)
+    
+    assert _handle(_request()).reply == main.FALLBACK_REPLY
+    assert actor.cancelled
+
+
+def test_scam_event_skips_pipeline_without_keywords(monkeypatch, reports):
+    sentinel, actor = FakeSentinel(SCAM), FakeActor()
+    _install(monkeypatch, sentinel, actor)
+    
+    assert _handle(_request(text="Good morning")).reply is None
+    assert sentinel.calls == 0 and not actor.started
+
+
+def _stream(monkeypatch, sentinel, actor, text=SCAM_TEXT, api_key=None):
+    _install(monkeypatch, sentinel, actor)
+    client = TestClient(main.app)
+    response = client.post(
+        "/scam-event/stream",
+        headers={"X-API-Key": api_key or main.API_KEY},
+        json={
+            "sessionId": "s1",
+            "message": {"sender": "scammer", "text": text, "timestamp": 1},
+            "conversationHistory": []
+        }
+    )
+    if response.status_code != 200:
+        return response, None
+    
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], orjson.loads(data[len("data: "):])))
+    return response, events
+
+
+def test_stream_sends_reply_deltas_then_done(monkeypatch, reports):
+    response, events = _stream(monkeypatch, FakeSentinel(SCAM), FakeActor())
+    
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert events == [
+        ("reply", {"delta": "Which "}),
+        ("reply", {"delta": "bank sir?"}),
+        ("done", {"status": "success", "reply": "Which bank sir?"}),
+    ]
+    assert len(reports) == 1
+
+
+def test_stream_without_engagement_sends_only_done(monkeypatch, reports):
+    _, events = _stream(monkeypatch, FakeSentinel(SAFE), FakeActor())
+    
+    assert events == [("done", {"status": "success", "reply": None})]
+    assert reports == []
+
+
+def test_stream_error_ends_with_what_was_sent(monkeypatch, reports):
+    actor = FakeActor(pieces=("Which ",), error=RuntimeError("boom"))
+    _, events = _stream(monkeypatch, FakeSentinel(SCAM), actor)
+    
+    assert events[-1] == ("done", {"status": "success", "reply": "Which "})
+
+
+def test_stream_detection_error_sends_fallback(monkeypatch, reports):
+    _, events = _stream(monkeypatch, FakeSentinel(error=RuntimeError("boom")), FakeActor())
+    
+    assert events == [("done", {"status": "success", "reply": main.FALLBACK_REPLY})]
+
+
+def test_stream_rejects_bad_api_key(monkeypatch, reports):
+    response, _ = _stream(monkeypatch, FakeSentinel(SCAM), FakeActor(), api_key="wrong")
+    
+    assert response.status_code == 403
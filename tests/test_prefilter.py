@@ -0,0 +1,94 @@
+import pytest
+
+from app.utils import prefilter
+
+
+BENIGN = [
+    "I have been living here for many years now",
+    "What a wonderful day it was",
+    "It is a simple question",
+    "I'm fine, thanks for asking",
+    "In any case, see you tomorrow",
+    "Can you share the zip code?",
+    "I bought a birthday card for her",
+    "Spinach and paneer for dinner",
+    "Where are you these days?",
+    "Happy birthday beta, have a great year",
+    "Please call me when you reach home",
+    "The weather is very hot in Pune",
+    "My email is ravi@example.org",
+    "He repaired the scooter himself",
+    "Let us meet at 5 near the temple",
+]
+
+SCAMS = [
+    "Your SBI account will be blocked today",
+    "Share the OTP sent to your phone",
+    "Dear customer, complete your KYC immediately",
+    "Send Rs 10 to verify your wallet",
+    "Pay ₹499 to release your parcel",
+    "You have won a lottery prize of 25 lakhs",
+    "Enter UPI PIN to receive money",
+    "Click http://bit.ly/x to update your details",
+    "Pay to refund.desk@okaxis now",
+    "CBI officer here, an arrest warrant is issued",
+    "Part time job, earn daily from home",
+    "Your payment failed, retry via the link",
+]
+
+
+def _engines():
+    yield pytest.param(prefilter._build_pattern().search, id="regex")
+    try:
+        import ahocorasick  # noqa: F401
+    except ImportError:
+        return
+    automaton = prefilter._build_automaton()
+    yield pytest.param(lambda text: prefilter._automaton_hit(automaton, text), id="ahocorasick")
+
+
+@pytest.fixture(params=list(_engines()))
+def has_keyword(request):
+    return request.param
+
+
+@pytest.mark.parametrize("text", BENIGN)
+def test_benign_messages_have_no_keyword(has_keyword, text):
+    assert not has_keyword(text.lower())
+
+
+@pytest.mark.parametrize("text", SCAMS)
+def test_scam_messages_have_a_keyword(has_keyword, text):
+    assert has_keyword(text.lower())
+
+
+def test_keyword_boundaries(has_keyword):
+    assert has_keyword("pin")
+    assert has_keyword("your pin.")
+    assert not has_keyword("spinning")
+    assert has_keyword("payments pending")  # stems may be inflected
+    assert not has_keyword("repay")
+    assert has_keyword("sbi.kyc.com")  # fragments match anywhere
+
+
+def test_might_be_scam_checks_every_text(monkeypatch):
+    monkeypatch.setattr(prefilter, "PREFILTER_ENABLED", True)
+    
+    assert not prefilter.might_be_scam("I'm fine", "In any case, thanks")
+    assert prefilter.might_be_scam("I'm fine", "Share the OTP")
+    assert prefilter.might_be_scam("SHARE THE OTP")
+
+
+def test_might_be_scam_counts_hits(monkeypatch):
+    monkeypatch.setattr(prefilter, "PREFILTER_ENABLED", True)
+    monkeypatch.setattr(prefilter, "_stats", {"checked": 0, "hits": 0})
+    
+    prefilter.might_be_scam("Share the OTP")
+    prefilter.might_be_scam("Good morning")
+    assert prefilter.prefilter_stats() == {"checked": 2, "hits": 1, "hit_rate": 0.5}
+
+
+def test_disabled_prefilter_passes_everything(monkeypatch):
+    monkeypatch.setattr(prefilter, "PREFILTER_ENABLED", False)
+    
+    assert prefilter.might_be_scam("Good morning")
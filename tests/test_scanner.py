@@ -0,0 +1,54 @@
+import pytest
+
+from app.utils import extraction, patterns, scanner
+
+
+SAMPLES = [
+    "Your account 123456789012 is blocked, verify at http://sbi-kyc.in now",
+    "Pay to refund.desk@okaxis or call 9876543210 immediately",
+    "Enter UPI PIN to receive money, OTP expires in 24 hours",
+    "Good morning, see you at the temple",
+    "",
+]
+
+
+def test_no_scanner_without_hyperscan(monkeypatch):
+    monkeypatch.setattr(scanner, "hyperscan", None)
+    
+    assert scanner.build_scanner({"digits": (r"\d+", 0)}) is None
+
+
+def test_prefilter_mode_accepts_unicode_word_boundaries():
+    pytest.importorskip("hyperscan")
+    accounts = {"accounts": (r"\b\d{11,18}\b", 0)}
+    
+    # Exact UCP mode rejects \b, which made the extraction scanner dead code
+    assert scanner.build_scanner(accounts) is None
+    
+    scan = scanner.build_scanner(accounts, prefilter=True)
+    assert scan is not None
+    assert scan("a/c 123456789012 is blocked") == {"accounts"}
+    assert scan("no numbers here") == set()
+
+
+def test_module_scanners_compile():
+    pytest.importorskip("hyperscan")
+    
+    assert extraction._scan_entities is not None
+    assert patterns._scan_signals is not None
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_extraction_matches_re_path(monkeypatch, text):
+    expected = extraction.extract_intelligence(text)
+    monkeypatch.setattr(extraction, "_scan_entities", None)
+    
+    assert extraction.extract_intelligence(text) == expected
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_signals_match_re_path(monkeypatch, text):
+    expected = patterns.check_rule_based_signals(text)
+    monkeypatch.setattr(patterns, "_scan_signals", None)
+    
+    assert patterns.check_rule_based_signals(text) == expected
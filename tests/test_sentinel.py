@@ -0,0 +1,73 @@
+import asyncio
+
+import orjson
+import pytest
+
+from app.brain1.sentinel import Sentinel
+from app.utils import llm_client
+
+
+MESSAGES = ["Your KYC is pending, click now", "Send Rs 500 to claim your prize"]
+
+
+@pytest.fixture
+def sentinel(monkeypatch):
+    monkeypatch.delenv("SENTINEL_CACHE_DIR", raising=False)
+    return Sentinel()
+
+
+def _fake_llm(monkeypatch, batch_reply):
+    prompts = []
+    
+    async def call(prompt, system_prompt=None, model=None):
+        prompts.append(prompt)
+        if "messages [1.." in prompt:
+            return batch_reply
+        return '{"confidence": 0.9, "reason": "single"}'
+    
+    monkeypatch.setattr(llm_client, "acall_openrouter_json", call)
+    return prompts
+
+
+def test_batch_verdicts_are_used_but_not_cached(sentinel, monkeypatch):
+    verdicts = [{"confidence": 0.8, "reason": "kyc"}, {"confidence": 0.7, "reason": "prize"}]
+    prompts = _fake_llm(monkeypatch, orjson.dumps(verdicts).decode())
+    
+    assert asyncio.run(sentinel._acall_llm_batch(MESSAGES)) == verdicts
+    assert len(prompts) == 1
+    assert all(sentinel._verdicts.get(sentinel._verdict_key(m)) is None for m in MESSAGES)
+
+
+def test_malformed_batch_falls_back_to_single_calls(sentinel, monkeypatch):
+    prompts = _fake_llm(monkeypatch, '[{"confidence": 0.8, "reason": "kyc"},')
+    
+    results = asyncio.run(sentinel._acall_llm_batch(MESSAGES))
+    assert results == [{"confidence": 0.9, "reason": "single"}] * 2
+    assert len(prompts) == 3
+    
+    # Single-message verdicts are cached as usual
+    assert all(sentinel._verdicts.get(sentinel._verdict_key(m)) for m in MESSAGES)
+
+
+def test_short_batch_falls_back_to_single_calls(sentinel, monkeypatch):
+    prompts = _fake_llm(monkeypatch, '[{"confidence": 0.8, "reason": "kyc"}]')
+    
+    assert asyncio.run(sentinel._acall_llm_batch(MESSAGES)) == [{"confidence": 0.9, "reason": "single"}] * 2
+    assert len(prompts) == 3
+
+
+@pytest.mark.parametrize("reply", [llm_client.FALLBACK_RESPONSES[0], "Error: No LLM_API_KEY found."])
+def test_failed_batch_call_uses_heuristics(sentinel, monkeypatch, reply):
+    prompts = _fake_llm(monkeypatch, reply)
+    
+    assert asyncio.run(sentinel._acall_llm_batch(MESSAGES)) == [None, None]
+    assert len(prompts) == 1
+
+
+def test_interrupted_batch_call_uses_heuristics(sentinel, monkeypatch):
+    async def call(prompt, system_prompt=None, model=None):
+        raise ConnectionError("stream interrupted")
+    
+    monkeypatch.setattr(llm_client, "acall_openrouter_json", call)
+    
+    assert asyncio.run(sentinel._acall_llm_batch(MESSAGES)) == [None, None]